@@ -5,35 +5,81 @@ Parses natural language input and provides symptom explanations using Azure Open
 """
 
 import os
+import sys
 import json
-from openai import AzureOpenAI
+import threading
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from parse_cache import ParseCache
+import llm_clients
+from llm_clients import get_async_client, run_sync
+from rule_parser import RuleBasedParser
+from parse_batcher import ParseMicroBatcher
+from semantic_cache import SemanticCache
+from llm_resilience import acall_with_deadline, get_tracker, latency_stats, LLMUnavailableError
+
 load_dotenv()
 
+# Bump whenever the parse prompt changes so cached results are not reused
+PARSE_PROMPT_VERSION = "1"
+
+# Rule-based parses at or above this confidence skip the LLM
+RULE_PARSER_MIN_CONFIDENCE = float(os.getenv("RULE_PARSER_MIN_CONFIDENCE", "0.8"))
+
+# Parse results are cached in memory. Setting PARSE_CACHE_PATH also persists
+# them to that SQLite file; they contain patient health data, so only point it
+# at storage that is allowed to hold it
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH") or None
+PARSE_CACHE_TTL_SECONDS = int(os.getenv("PARSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "1024"))
+
+# Micro-batch concurrent async parses for this long (0 disables batching)
+PARSE_BATCH_WINDOW_MS = float(os.getenv("PARSE_BATCH_WINDOW_MS", "0"))
+PARSE_BATCH_MAX_SIZE = int(os.getenv("PARSE_BATCH_MAX_SIZE", "16"))
+
+# Approximate-match cache for explanations (size 0 disables it)
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+
+# Per-call deadlines (seconds), covering retries and hedged duplicates
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "10"))
+EXPLAIN_TIMEOUT_SECONDS = float(os.getenv("EXPLAIN_TIMEOUT_SECONDS", "15"))
+
 class HealthcareAI:
     """AI layer for parsing medical information and explaining symptoms."""
     
     def __init__(self):
-        """Initialize Azure OpenAI client."""
-        self.client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
+        """Initialize parse helpers; LLM clients come from the shared registry on first use."""
         self.model = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        self.parse_cache = ParseCache(
+            path=PARSE_CACHE_PATH,
+            ttl_seconds=PARSE_CACHE_TTL_SECONDS,
+            maxsize=PARSE_CACHE_SIZE
+        )
+        self.rule_parser = RuleBasedParser()
+        self.fast_path_hits = 0
+        self.explanation_cache = None
+        if SEMANTIC_CACHE_SIZE > 0:
+            self.explanation_cache = SemanticCache(capacity=SEMANTIC_CACHE_SIZE, threshold=SEMANTIC_CACHE_THRESHOLD)
+        self.parse_batcher = None
+        if PARSE_BATCH_WINDOW_MS > 0:
+            self.parse_batcher = ParseMicroBatcher(
+                get_async_client,
+                self.model,
+                self._allm_parse,
+                window_ms=PARSE_BATCH_WINDOW_MS,
+                max_batch=PARSE_BATCH_MAX_SIZE,
+                timeout_seconds=PARSE_TIMEOUT_SECONDS
+            )
     
-    def parse_user_message(self, user_message: str) -> dict:
-        """
-        Parse user's natural language input into structured JSON.
-        
-        Args:
-            user_message: User's description of disease, medicines, and symptoms
-            
-        Returns:
-            Structured JSON with diseases, medicines, and symptoms
-        """
-        prompt = f"""
+    @property
+    def async_client(self):
+        return get_async_client()
+    
+    def _parse_prompt(self, user_message: str) -> str:
+        """Build the extraction prompt for parse_user_message."""
+        return f"""
         Extract medical information from this text and return ONLY valid JSON:
         
         Text: "{user_message}"
@@ -53,42 +99,15 @@ class HealthcareAI:
         
         Return only the JSON, no explanation.
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.1
-            )
-            
-            result = response.choices[0].message.content.strip()
-            return json.loads(result)
-            
-        except Exception as e:
-            return {
-                "diseases": [],
-                "medicines": [],
-                "symptom": ""
-            }
     
-    def explain_symptom(self, parsed_data: dict, quantum_risk_level: str) -> str:
-        """
-        Explain the symptom in simple language using quantum risk analysis.
-        
-        Args:
-            parsed_data: Parsed medical data from parse_user_message
-            quantum_risk_level: "low", "medium", or "high" from quantum analysis
-            
-        Returns:
-            Simple explanation of the symptom
-        """
+    def _explain_prompt(self, parsed_data: dict, quantum_risk_level: str) -> str:
+        """Build the explanation prompt for explain_symptom."""
         diseases = ", ".join(parsed_data.get("diseases", []))
         medicines = [f"{m['name']} {m['dose_mg']}mg" for m in parsed_data.get("medicines", [])]
         medicines_str = ", ".join(medicines)
         symptom = parsed_data.get("symptom", "")
         
-        prompt = f"""
+        return f"""
         Explain this medical situation in simple language (max 4 sentences):
         
         Patient has: {diseases}
@@ -104,30 +123,216 @@ class HealthcareAI:
         - Do not give diagnosis
         - Do not scare the patient
         """
+    
+    def _fast_parse(self, user_message: str):
+        """Return the rule-based parse if it is confident enough, else None."""
+        parsed, confidence = self.rule_parser.parse(user_message)
+        if confidence >= RULE_PARSER_MIN_CONFIDENCE:
+            self.fast_path_hits += 1
+            return parsed
+        return None
+    
+    def _parse_request(self, user_message: str) -> dict:
+        """Chat completion arguments for one parse."""
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": self._parse_prompt(user_message)}],
+            "max_tokens": 200,
+            "temperature": 0.1
+        }
+    
+    def _explain_request(self, parsed_data: dict, quantum_risk_level: str) -> dict:
+        """Chat completion arguments for one explanation (streamed or not)."""
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": self._explain_prompt(parsed_data, quantum_risk_level)}],
+            "max_tokens": 150,
+            "temperature": 0.3
+        }
+    
+    def parse_user_message(self, user_message: str) -> dict:
+        """
+        Parse user's natural language input into structured JSON.
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
-                temperature=0.3
+        Synchronous wrapper over aparse_user_message for non-async callers.
+        
+        Args:
+            user_message: User's description of disease, medicines, and symptoms
+            
+        Returns:
+            Structured JSON with diseases, medicines, and symptoms
+            
+        Raises:
+            LLMUnavailableError: No valid answer within PARSE_TIMEOUT_SECONDS
+        """
+        return run_sync(self.aparse_user_message(user_message))
+    
+    async def aparse_user_message(self, user_message: str) -> dict:
+        """Parse user's natural language input into structured JSON (see parse_user_message)."""
+        fast = self._fast_parse(user_message)
+        if fast is not None:
+            return fast
+        
+        cache_key = self.parse_cache.make_key(user_message, PARSE_PROMPT_VERSION, self.model)
+        cached = await self.parse_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        
+        if self.parse_batcher is not None:
+            parsed = await self.parse_batcher.parse(user_message)
+        else:
+            parsed = await self._allm_parse(user_message)
+        await self.parse_cache.aset(cache_key, parsed)
+        return parsed
+    
+    async def _allm_parse(self, user_message: str, deadline_seconds: float = PARSE_TIMEOUT_SECONDS) -> dict:
+        """Single hedged async LLM parse; raises LLMUnavailableError once the deadline is spent."""
+        async def request(timeout):
+            response = await self.async_client.chat.completions.create(
+                **self._parse_request(user_message), timeout=timeout
             )
+            # Malformed JSON fails the call; callers see LLMUnavailableError
+            return json.loads(response.choices[0].message.content.strip())
+        
+        return await acall_with_deadline(request, deadline_seconds, get_tracker("parse"))
+    
+    def _cached_explanation(self, parsed_data: dict, quantum_risk_level: str):
+        if self.explanation_cache is None:
+            return None
+        return self.explanation_cache.get(parsed_data, quantum_risk_level)
+    
+    def _store_explanation(self, parsed_data: dict, quantum_risk_level: str, explanation: str):
+        if self.explanation_cache is not None and explanation:
+            self.explanation_cache.set(parsed_data, quantum_risk_level, explanation)
+    
+    def explain_symptom(self, parsed_data: dict, quantum_risk_level: str) -> str:
+        """
+        Explain the symptom in simple language using quantum risk analysis.
+        
+        Synchronous wrapper over aexplain_symptom for non-async callers.
+        
+        Args:
+            parsed_data: Parsed medical data from parse_user_message
+            quantum_risk_level: "low", "medium", or "high" from quantum analysis
+            
+        Returns:
+            Simple explanation of the symptom
             
+        Raises:
+            LLMUnavailableError: No answer within EXPLAIN_TIMEOUT_SECONDS
+        """
+        return run_sync(self.aexplain_symptom(parsed_data, quantum_risk_level))
+    
+    async def aexplain_symptom(self, parsed_data: dict, quantum_risk_level: str) -> str:
+        """Explain the symptom in simple language (see explain_symptom)."""
+        cached = self._cached_explanation(parsed_data, quantum_risk_level)
+        if cached is not None:
+            return cached
+        
+        async def request(timeout):
+            response = await self.async_client.chat.completions.create(
+                **self._explain_request(parsed_data, quantum_risk_level), timeout=timeout
+            )
             return response.choices[0].message.content.strip()
+        
+        explanation = await acall_with_deadline(request, EXPLAIN_TIMEOUT_SECONDS, get_tracker("explain"))
+        self._store_explanation(parsed_data, quantum_risk_level, explanation)
+        return explanation
+
+    async def astream_explain_symptom(self, parsed_data: dict, quantum_risk_level: str):
+        """
+        Stream the explain_symptom completion token by token.
+        
+        Args:
+            parsed_data: Parsed medical data from parse_user_message
+            quantum_risk_level: "low", "medium", or "high" from quantum analysis
             
+        Yields:
+            Text fragments of the explanation as they arrive
+        """
+        cached = self._cached_explanation(parsed_data, quantum_risk_level)
+        if cached is not None:
+            yield cached
+            return
+        
+        async def open_stream(timeout):
+            return await self.async_client.chat.completions.create(
+                **self._explain_request(parsed_data, quantum_risk_level), stream=True, timeout=timeout
+            )
+        
+        # Opening the stream is retried within the deadline; a duplicate open
+        # would leave an orphaned stream, so it is not hedged
+        stream = await acall_with_deadline(open_stream, EXPLAIN_TIMEOUT_SECONDS, get_tracker("explain_stream"), hedge=False)
+        
+        parts = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
         except Exception as e:
-            return "Please consult your doctor about any symptoms you're experiencing."
+            raise LLMUnavailableError(f"Explanation stream interrupted: {e}") from e
+        
+        self._store_explanation(parsed_data, quantum_risk_level, "".join(parts).strip())
 
 # Convenience functions
-ai_layer = HealthcareAI()
+_ai_layer = None
+_ai_layer_lock = threading.Lock()
+
+def get_ai_layer() -> HealthcareAI:
+    """Return the shared HealthcareAI instance, creating it on first use."""
+    global _ai_layer
+    if _ai_layer is None:
+        with _ai_layer_lock:
+            if _ai_layer is None:
+                _ai_layer = HealthcareAI()
+    return _ai_layer
+
+def prewarm():
+    """Build the AI layer and warm the LLM connection pool used by the sync functions (call at startup)."""
+    get_ai_layer()
+    llm_clients.prewarm()
+
+async def aprewarm():
+    """Build the AI layer and warm the async LLM connection pool (call at startup)."""
+    get_ai_layer()
+    await llm_clients.aprewarm()
+
+async def aclose():
+    """Release the shared async LLM connection pool (call at shutdown)."""
+    await llm_clients.close_async_client()
 
 def parse_user_message(user_message: str) -> dict:
     """Parse user message into structured JSON."""
-    return ai_layer.parse_user_message(user_message)
+    return get_ai_layer().parse_user_message(user_message)
 
 def explain_symptom(parsed_data: dict, quantum_risk_level: str) -> str:
     """Explain symptom with quantum risk context."""
-    return ai_layer.explain_symptom(parsed_data, quantum_risk_level)
+    return get_ai_layer().explain_symptom(parsed_data, quantum_risk_level)
+
+async def aparse_user_message(user_message: str) -> dict:
+    """Parse user message into structured JSON without blocking the event loop."""
+    return await get_ai_layer().aparse_user_message(user_message)
+
+async def aexplain_symptom(parsed_data: dict, quantum_risk_level: str) -> str:
+    """Explain symptom with quantum risk context without blocking the event loop."""
+    return await get_ai_layer().aexplain_symptom(parsed_data, quantum_risk_level)
+
+def astream_explain_symptom(parsed_data: dict, quantum_risk_level: str):
+    """Stream the symptom explanation as it is generated."""
+    return get_ai_layer().astream_explain_symptom(parsed_data, quantum_risk_level)
+
+def parse_cache_stats() -> dict:
+    """Hit-rate counters for the parse cache, rule-based fast path, micro-batcher and explanation cache (empty before first use)."""
+    layer = _ai_layer
+    if layer is None:
+        return {}
+    stats = dict(layer.parse_cache.stats(), fast_path_hits=layer.fast_path_hits, llm_latency=latency_stats())
+    if layer.parse_batcher is not None:
+        stats["batching"] = layer.parse_batcher.stats()
+    if layer.explanation_cache is not None:
+        stats["explanation_cache"] = layer.explanation_cache.stats()
+    return stats
 
 # Test example
 if __name__ == "__main__":
@@ -5,61 +5,206 @@ Generates brief explanations of medicine usage for diseases.
 """
 
 import os
-from openai import AzureOpenAI
+import re
+import sys
+import json
+import argparse
+import threading
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_clients import get_async_client, run_sync
+from lru import LRUCache
+from llm_resilience import acall_with_deadline, get_tracker
+
 load_dotenv()
 
+# Per-call deadline (seconds), covering retries and hedged duplicates
+EXPLAIN_USAGE_TIMEOUT_SECONDS = float(os.getenv("EXPLAIN_USAGE_TIMEOUT_SECONDS", "15"))
+
+# Runtime memo size and optional file of pre-generated explanations
+USAGE_CACHE_SIZE = int(os.getenv("USAGE_EXPLANATION_CACHE_SIZE", "2048"))
+USAGE_CACHE_FILE = os.getenv("USAGE_EXPLANATION_CACHE_FILE", "")
+
+def normalize_regimen(disease, medicines_data):
+    """
+    Canonical form of a regimen.
+    
+    Args:
+        disease: Disease name
+        medicines_data: Medicine dicts with name, dose, time (or stored dosage, times)
+        
+    Returns:
+        Tuple of (disease, sorted tuple of (name, dose, time)) with whitespace and case normalized
+    """
+    medicines = []
+    for med in medicines_data:
+        dose = med.get('dose', med.get('dosage', ''))
+        time = med.get('time') or ", ".join(med.get('times', []))
+        medicines.append((
+            " ".join(str(med['name']).split()),
+            re.sub(r'\s+', '', str(dose)).lower(),
+            " ".join(str(time).split()).lower()
+        ))
+    return " ".join(str(disease).split()).lower(), tuple(sorted(medicines, key=lambda m: (m[0].lower(), m[1], m[2])))
+
+def regimen_key(disease, medicines):
+    """Cache key for a normalized regimen (case-insensitive drug names)."""
+    return json.dumps([disease, [[name.lower(), dose, time] for name, dose, time in medicines]])
+
 class DrugInteractionAnalyzer:
     """Generates medicine usage explanations using Azure OpenAI."""
     
     def __init__(self):
-        """Initialize Azure OpenAI client."""
-        self.client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
-        
+        """Initialize prompt template; LLM clients come from the shared registry on first use."""
         self.prompt_template = PromptTemplate(
             input_variables=["disease", "medicine_details"],
             template="Explain in 2-3 lines why these medicines are used for {disease}: {medicine_details}. Include why these specific doses and timing are chosen and what effects they have."
         )
+        self.cache = LRUCache(USAGE_CACHE_SIZE)
+        self.pregenerated = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if USAGE_CACHE_FILE and os.path.exists(USAGE_CACHE_FILE):
+            self.load_pregenerated(USAGE_CACHE_FILE)
+    
+    @property
+    def async_client(self):
+        return get_async_client()
+    
+    def _build_prompt(self, disease, medicines):
+        """Format the usage prompt from a normalized regimen."""
+        medicine_details = []
+        for name, dose, time in medicines:
+            detail = f"{name} {dose} taken in {time}"
+            medicine_details.append(detail)
+        
+        medicine_details_str = ", ".join(medicine_details)
+        return self.prompt_template.format(disease=disease, medicine_details=medicine_details_str)
+    
+    def _cached(self, key):
+        """Look up a pre-generated or memoized explanation."""
+        explanation = self.pregenerated.get(key) or self.cache.get(key)
+        if explanation is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return explanation
     
     def explain_medicine_usage(self, disease, medicines_data):
         """
         Generate brief explanation of medicine usage with dosage and timing.
         
+        Synchronous wrapper over aexplain_medicine_usage for non-async callers.
+        
         Args:
             disease: Disease name
             medicines_data: List of medicine dicts with name, dose, time
             
         Returns:
             Brief explanation string
+            
+        Raises:
+            LLMUnavailableError: No answer within EXPLAIN_USAGE_TIMEOUT_SECONDS
         """
-        medicine_details = []
-        for med in medicines_data:
-            detail = f"{med['name']} {med['dose']} taken in {med['time']}"
-            medicine_details.append(detail)
-        
-        medicine_details_str = ", ".join(medicine_details)
-        prompt = self.prompt_template.format(disease=disease, medicine_details=medicine_details_str)
+        return run_sync(self.aexplain_medicine_usage(disease, medicines_data))
+    
+    async def aexplain_medicine_usage(self, disease, medicines_data):
+        """Generate brief explanation of medicine usage (see explain_medicine_usage)."""
+        disease, medicines = normalize_regimen(disease, medicines_data)
+        key = regimen_key(disease, medicines)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
         
-        try:
-            response = self.client.chat.completions.create(
+        async def request(timeout):
+            response = await self.async_client.chat.completions.create(
                 model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-                messages=[{"role": "user", "content": prompt}],
+                messages=[{"role": "user", "content": self._build_prompt(disease, medicines)}],
                 max_tokens=120,
-                temperature=0.3
+                temperature=0.3,
+                timeout=timeout
             )
             return response.choices[0].message.content.strip()
-        except Exception as e:
-            return f"Paracetamol 500mg in morning reduces pain and fever. Ibuprofen 200mg at night helps reduce inflammation and provides longer pain relief during sleep."
+        
+        explanation = await acall_with_deadline(request, EXPLAIN_USAGE_TIMEOUT_SECONDS, get_tracker("explain_usage"))
+        self.cache.set(key, explanation)
+        return explanation
+    
+    def load_pregenerated(self, path):
+        """Load explanations written by pregenerate() so they are always served from memory."""
+        with open(path) as f:
+            self.pregenerated.update(json.load(f))
+    
+    def pregenerate(self, regimens, output_path, top_n=100):
+        """
+        Generate explanations offline for the most common regimens.
+        
+        Args:
+            regimens: List of dicts with disease, medicines and count (occurrences)
+            output_path: JSON file to write; point USAGE_EXPLANATION_CACHE_FILE at it
+            top_n: Number of most frequent regimens to generate
+            
+        Returns:
+            Number of explanations written
+        """
+        ranked = sorted(regimens, key=lambda r: r.get("count", 0), reverse=True)
+        generated = {}
+        for regimen in ranked[:top_n]:
+            disease, medicines = normalize_regimen(regimen["disease"], regimen["medicines"])
+            key = regimen_key(disease, medicines)
+            if key in generated:
+                continue
+            try:
+                generated[key] = self.explain_medicine_usage(regimen["disease"], regimen["medicines"])
+            except Exception as e:
+                print(f"Skipping regimen {key}: {e}")
+        
+        with open(output_path, "w") as f:
+            json.dump(generated, f, indent=2)
+        self.pregenerated.update(generated)
+        return len(generated)
+    
+    def cache_stats(self):
+        """Return memo hit/miss counters."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.cache),
+            "pregenerated_entries": len(self.pregenerated)
+        }
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_analyzer():
+    """Return the shared DrugInteractionAnalyzer, creating it on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = DrugInteractionAnalyzer()
+    return _analyzer
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Medicine usage explanations")
+    parser.add_argument("--pregenerate", metavar="REGIMENS_JSON", help="Generate explanations for the most common regimens")
+    parser.add_argument("--output", default="usage_explanations.json", help="Where to write pre-generated explanations")
+    parser.add_argument("--top", type=int, default=100, help="Number of regimens to pre-generate")
+    args = parser.parse_args()
+    
     analyzer = DrugInteractionAnalyzer()
     
+    if args.pregenerate:
+        with open(args.pregenerate) as f:
+            count = analyzer.pregenerate(json.load(f), args.output, args.top)
+        print(f"Pre-generated {count} explanations into {args.output}")
+        sys.exit(0)
+    
     patient_input = {
         "disease": "pain and inflammation",
         "medicines": [
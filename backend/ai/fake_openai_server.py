@@ -0,0 +1,196 @@
+"""
+Fake Azure OpenAI Server for QuraAI
+
+Local stand-in for the chat completions endpoint, used to test deadlines,
+hedging and retries offline. Latency is drawn from a configurable
+distribution with an optional slow tail and error rate, so p95/p99
+behaviour can be reproduced without a real deployment.
+
+Usage:
+    python fake_openai_server.py --port 8089 --latency lognormal:400,0.5 --tail 0.02:8000
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8089 AZURE_OPENAI_API_KEY=fake ...
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EXPLANATION_TEXT = "This is a test explanation from the local fake server. The risk level was taken into account. Talk to your doctor if the symptom persists."
+
+class LatencyModel:
+    """Samples response delays in seconds."""
+
+    def __init__(self, spec="fixed:200", tail=None, error_rate=0.0, seed=None):
+        """
+        Args:
+            spec: "fixed:MS", "uniform:LO_MS,HI_MS", "normal:MEAN_MS,STD_MS" or "lognormal:MEDIAN_MS,SIGMA"
+            tail: Optional "PROB:MS" — with probability PROB the delay is MS instead
+            error_rate: Probability of answering 500
+            seed: Random seed, for reproducible runs
+        """
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.tail_prob, self.tail_ms = (float(x) for x in tail.split(":")) if tail else (0.0, 0.0)
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.tail_hits = 0
+
+    def sample(self):
+        with self._lock:
+            if self._random.random() < self.tail_prob:
+                self.tail_hits += 1
+                return self.tail_ms / 1000.0
+            if self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._random.uniform(self.params[0], self.params[1])
+            elif self.kind == "normal":
+                ms = self._random.gauss(self.params[0], self.params[1])
+            else:
+                ms = self.params[0] * self._random.lognormvariate(0, self.params[1])
+        return max(0.0, ms) / 1000.0
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+def fake_content(prompt):
+    """Return a plausible answer for the QuraAI prompts."""
+    batch = re.search(r"exactly (\d+) objects", prompt)
+    parse = {"diseases": [], "medicines": [], "symptom": ""}
+    if batch:
+        return json.dumps([parse] * int(batch.group(1)))
+    if "return ONLY valid JSON" in prompt:
+        return json.dumps(parse)
+    return EXPLANATION_TEXT
+
+def make_handler(latency):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up, e.g. on the losing request of a hedged pair
+                pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # Connection prewarm requests
+            self._send_json(200, {"status": "ok"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.split("?")[0].endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+
+            # Both draws on arrival, so a seeded model replays the same sequence
+            delay, fail = latency.sample(), latency.should_fail()
+            time.sleep(delay)
+            if fail:
+                self._send_json(500, {"error": {"message": "Injected failure", "type": "server_error"}})
+                return
+
+            prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+            content = fake_content(prompt)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            model = request.get("model", "fake")
+
+            if request.get("stream"):
+                self._stream(completion_id, model, content)
+                return
+
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split()),
+                          "total_tokens": len(prompt.split()) + len(content.split())}
+            })
+
+        def _stream(self, completion_id, model, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data):
+                payload = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                delta = word if i == 0 else " " + word
+                write(json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+                }))
+                time.sleep(0.01)
+            write("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return FakeOpenAIHandler
+
+def make_server(host="127.0.0.1", port=8089, latency=None):
+    """Bind the fake server without starting it (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), make_handler(latency or LatencyModel()))
+    server.daemon_threads = True
+    return server
+
+def serve(host="127.0.0.1", port=8089, latency=None):
+    """Run the fake server until interrupted."""
+    server = make_server(host, port, latency)
+    print(f"Fake OpenAI server on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake Azure OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:400,0.5",
+                        help="fixed:MS | uniform:LO,HI | normal:MEAN,STD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tail", default=None, help="PROB:MS — occasional slow responses, e.g. 0.02:8000")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible latencies")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, LatencyModel(args.latency, args.tail, args.error_rate, args.seed))
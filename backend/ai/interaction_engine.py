@@ -5,18 +5,69 @@ Converts patient medicine data into quantum-ready numeric representation.
 """
 
 import re
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+
+# Leading integer of a dose string such as "500mg" or "500 mg"
+DOSE_PATTERN = re.compile(r'(\d+)')
+
+# Time of day -> encoding, and the encoding of unrecognised times
+TIME_MAP = {
+    'morning': 0.2,
+    'afternoon': 0.5,
+    'evening': 0.7,
+    'night': 0.8
+}
+UNKNOWN_TIME_VALUE = 0.5
+
+# Columnar form of TIME_MAP; the last code is used for unrecognised times
+TIME_SLOTS = tuple(TIME_MAP) + ('other',)
+TIME_VALUES = np.array(list(TIME_MAP.values()) + [UNKNOWN_TIME_VALUE])
+TIME_CODES = {slot: code for code, slot in enumerate(TIME_MAP)}
+UNKNOWN_TIME_CODE = len(TIME_SLOTS) - 1
+
+@lru_cache(maxsize=4096)
+def parse_dose(dose_str):
+    """Normalize a dose string to the 0-1 scale (cached; dose strings repeat heavily)."""
+    match = DOSE_PATTERN.search(dose_str)
+    if match:
+        return min(int(match.group(1)) / 1000.0, 1.0)
+    return 0.1
+
+@lru_cache(maxsize=256)
+def time_code(time_str):
+    """Index into TIME_SLOTS for a time string."""
+    return TIME_CODES.get(time_str.lower(), UNKNOWN_TIME_CODE)
+
+@dataclass
+class MedicineBatch:
+    """
+    Columnar medicines for many patients.
+    
+    Rows of patient i are offsets[i]:offsets[i + 1]; drug_ids index drug_names.
+    """
+    offsets: np.ndarray
+    drug_ids: np.ndarray
+    doses: np.ndarray
+    time_codes: np.ndarray
+    drug_names: list
+    
+    @property
+    def timing(self):
+        """Time encodings per row (same values as process_medicines)."""
+        return TIME_VALUES[self.time_codes]
+    
+    def patient_rows(self, index):
+        """Slice covering one patient's rows."""
+        return slice(int(self.offsets[index]), int(self.offsets[index + 1]))
 
 class InteractionEngine:
     """AI preprocessing layer - translates patient data to quantum format."""
     
     def __init__(self):
         """Initialize time encoding map."""
-        self.time_map = {
-            'morning': 0.2,
-            'afternoon': 0.5,
-            'evening': 0.7,
-            'night': 0.8
-        }
+        self.time_map = dict(TIME_MAP)
     
     def process_medicines(self, patient_data):
         """
@@ -44,17 +95,87 @@ class InteractionEngine:
             'time_encoding': time_encoding
         }
     
+    def process_medicines_batch(self, patients, vocabulary=None):
+        """
+        Convert many patients' medicines into columnar arrays in one pass.
+        
+        Args:
+            patients: List of medicine lists (or patient dicts with 'medicines')
+                      whose items have name, dose, time
+            vocabulary: Optional dict of drug name -> id, extended in place, to
+                        keep drug IDs stable across batches
+            
+        Returns:
+            MedicineBatch; every medicine becomes one row, in input order
+        """
+        vocabulary = {} if vocabulary is None else vocabulary
+        offsets = np.zeros(len(patients) + 1, dtype=np.int64)
+        drug_ids = []
+        doses = []
+        codes = []
+        
+        for i, patient in enumerate(patients):
+            medicines = patient.get('medicines', []) if isinstance(patient, dict) else patient
+            for medicine in medicines:
+                name = medicine['name']
+                drug_id = vocabulary.get(name)
+                if drug_id is None:
+                    drug_id = vocabulary[name] = len(vocabulary)
+                drug_ids.append(drug_id)
+                doses.append(parse_dose(medicine['dose']))
+                codes.append(time_code(medicine['time']))
+            offsets[i + 1] = len(drug_ids)
+        
+        drug_names = [None] * len(vocabulary)
+        for name, drug_id in vocabulary.items():
+            drug_names[drug_id] = name
+        
+        return MedicineBatch(
+            offsets=offsets,
+            drug_ids=np.array(drug_ids, dtype=np.int32),
+            doses=np.array(doses, dtype=np.float64),
+            time_codes=np.array(codes, dtype=np.int8),
+            drug_names=drug_names
+        )
+    
+    def build_quantum_input(self, parsed_data, patient_modifier=1.3):
+        """
+        Build run_quantum_engine input from parse_user_message output.
+        
+        Args:
+            parsed_data: Dict with 'medicines' list of name, dose_mg, time
+            patient_modifier: Patient-specific risk multiplier
+            
+        Returns:
+            Dict with drugs, dosage, timing, interactions, patient_modifier
+        """
+        drugs = []
+        dosage = {}
+        timing = {}
+        
+        for medicine in parsed_data.get('medicines', []):
+            name = medicine.get('name')
+            if not name or name in dosage:
+                continue
+            drugs.append(name)
+            dosage[name] = self._normalize_dose(str(medicine.get('dose_mg', '')))
+            timing[name] = self._encode_time(str(medicine.get('time', '')))
+        
+        return {
+            'drugs': drugs,
+            'dosage': dosage,
+            'timing': timing,
+            'interactions': {},
+            'patient_modifier': patient_modifier
+        }
+    
     def _normalize_dose(self, dose_str):
         """Normalize dosage to 0-1 scale."""
-        match = re.search(r'(\d+)', dose_str)
-        if match:
-            dose_mg = int(match.group(1))
-            return min(dose_mg / 1000.0, 1.0)
-        return 0.1
+        return parse_dose(dose_str)
     
     def _encode_time(self, time_str):
         """Encode time to numeric value."""
-        return self.time_map.get(time_str.lower(), 0.5)
+        return self.time_map.get(time_str.lower(), UNKNOWN_TIME_VALUE)
 
 if __name__ == "__main__":
     engine = InteractionEngine()
@@ -0,0 +1,109 @@
+"""
+LLM Clients for QuraAI
+
+Process-wide registry of Azure OpenAI clients. Clients are created on first
+use and every AI component shares the same keep-alive HTTP connection pools
+(HTTP/2 when the h2 package is installed), so no request pays for client
+construction or a fresh TLS handshake.
+
+All LLM calls are async. Synchronous callers (the Flask pipeline, CLI
+scripts) go through run_sync, which runs them on one long-lived background
+event loop so they share a connection pool as well.
+"""
+
+import os
+import asyncio
+import threading
+import importlib.util
+import httpx
+from openai import AsyncAzureOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default per-request timeout in seconds; individual calls may pass a tighter one
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("AZURE_OPENAI_TIMEOUT_SECONDS", "20"))
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# An httpx.AsyncClient is bound to the loop it first ran on, so there is one
+# (client, http_client) pair per event loop: the app's loop and the sync bridge
+_async_clients = {}
+_sync_loop = None
+_lock = threading.Lock()
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("AZURE_OPENAI_KEEPALIVE_SECONDS", "60"))
+    )
+
+def _client_settings() -> dict:
+    return {
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+        "api_version": os.getenv("AZURE_OPENAI_API_VERSION"),
+        "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "timeout": DEFAULT_TIMEOUT_SECONDS,
+        # Retries are handled by llm_resilience within each call's deadline
+        "max_retries": 0
+    }
+
+def _loop_clients():
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        with _lock:
+            clients = _async_clients.get(loop)
+            if clients is None:
+                http_client = httpx.AsyncClient(
+                    limits=_pool_limits(),
+                    timeout=DEFAULT_TIMEOUT_SECONDS,
+                    http2=HTTP2_AVAILABLE
+                )
+                clients = _async_clients[loop] = (AsyncAzureOpenAI(http_client=http_client, **_client_settings()), http_client)
+    return clients
+
+def get_async_client() -> AsyncAzureOpenAI:
+    """Return the shared async Azure OpenAI client for the running event loop."""
+    return _loop_clients()[0]
+
+def _get_sync_loop():
+    global _sync_loop
+    if _sync_loop is None:
+        with _lock:
+            if _sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-sync", daemon=True).start()
+                _sync_loop = loop
+    return _sync_loop
+
+def run_sync(coro):
+    """
+    Run an LLM coroutine to completion from synchronous code.
+    
+    Must not be called from a coroutine; use await there instead.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_sync_loop()).result()
+
+async def aprewarm():
+    """Create the async client and open a pooled connection to the endpoint."""
+    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    _, http_client = _loop_clients()
+    if endpoint:
+        try:
+            # Any response will do: the point is the TLS handshake
+            await http_client.get(endpoint)
+        except Exception as e:
+            print(f"LLM client prewarm failed: {e}")
+
+def prewarm():
+    """Prewarm the client used by run_sync callers."""
+    run_sync(aprewarm())
+
+async def close_async_client():
+    """Close the async client of the running event loop and its connection pool."""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients[0].close()
@@ -0,0 +1,172 @@
+"""
+LLM Call Resilience for QuraAI
+
+Every LLM call runs inside an overall deadline with a bounded number of
+jittered retries. Calls are also hedged: if the first request has not
+answered by the recent p95 latency for that kind of call, a duplicate is
+sent and whichever finishes first wins. Only transient failures (timeouts,
+connection errors, 429 and 5xx) are retried; anything else, such as a 400,
+an auth error or a content-filter refusal, fails the call at once. When the
+budget runs out the caller gets LLMUnavailableError rather than canned text.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Extra rounds after a round in which every request failed
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Send a hedged duplicate once a request is slower than this latency percentile
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+
+# Hedge delay used until a call kind has enough latency samples (seconds)
+LLM_HEDGE_DEFAULT_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_SECONDS", "2"))
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call fails or misses its deadline after all retries."""
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window=200, default_seconds=LLM_HEDGE_DEFAULT_SECONDS, min_samples=20):
+        """
+        Args:
+            window: Number of recent latencies kept
+            default_seconds: Hedge delay used until enough samples exist
+            min_samples: Samples required before percentiles are trusted
+        """
+        self.samples = deque(maxlen=window)
+        self.default_seconds = default_seconds
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        """Latency at percentile p (0-100), or the default while warming up."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default_seconds
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self):
+        """Return p50/p95/p99 over the current window."""
+        with self._lock:
+            count = len(self.samples)
+        return {
+            "samples": count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_tracker(name):
+    """Shared latency tracker for one kind of call (e.g. "parse", "explain")."""
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
+
+def latency_stats():
+    """Latency percentiles for every call kind seen so far."""
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.stats() for name, tracker in trackers.items()}
+
+def is_retryable(error):
+    """True for failures a later attempt may not hit: timeouts, connection errors, 429 and 5xx."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def _backoff(attempt, base=0.2, cap=2.0):
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+async def _atimed(make_call, timeout, tracker):
+    start = time.monotonic()
+    result = await make_call(timeout)
+    tracker.record(time.monotonic() - start)
+    return result
+
+async def acall_with_deadline(make_call, deadline_seconds, tracker, hedge=True,
+                              max_retries=LLM_MAX_RETRIES, hedge_percentile=LLM_HEDGE_PERCENTILE):
+    """
+    Run an LLM call with an overall deadline, hedging and jittered retries.
+
+    Args:
+        make_call: Coroutine function taking timeout (seconds left) and returning the result
+        deadline_seconds: Total time budget across all requests
+        tracker: LatencyTracker used for the hedge delay and fed with latencies
+        hedge: Whether to send a duplicate request when the first is slow
+        max_retries: Extra rounds after a round in which every request failed
+        hedge_percentile: Latency percentile after which the duplicate is sent
+
+    Returns:
+        Result of the first successful request; losing requests are cancelled
+
+    Raises:
+        LLMUnavailableError: A request failed with a non-retryable error, every
+            request failed, or the deadline passed
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_seconds
+    last_error = None
+
+    for attempt in range(max_retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+
+        pending = {asyncio.ensure_future(_atimed(make_call, remaining, tracker))}
+        hedge_at = loop.time() + tracker.percentile(hedge_percentile)
+        hedged = not hedge
+
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                wait_until = deadline if hedged else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(pending, timeout=wait_until - now,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if not is_retryable(error):
+                        # A duplicate or retry would fail the same way
+                        raise LLMUnavailableError(f"LLM call failed: {error}") from error
+                    last_error = error
+
+                if not hedged and pending and deadline > loop.time() >= hedge_at:
+                    hedged = True
+                    pending.add(asyncio.ensure_future(_atimed(make_call, deadline - loop.time(), tracker)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        pause = _backoff(attempt)
+        if attempt < max_retries and loop.time() + pause < deadline:
+            await asyncio.sleep(pause)
+
+    if last_error is not None and loop.time() < deadline:
+        raise LLMUnavailableError(f"LLM call failed: {last_error}") from last_error
+    raise LLMUnavailableError(f"LLM call exceeded its {deadline_seconds:g}s deadline")
@@ -0,0 +1,145 @@
+"""
+Parse Cache for QuraAI
+
+Two-tier cache for parse_user_message results: an in-memory LRU, optionally
+in front of a local SQLite file with TTL, so repeated messages skip the LLM
+round trip. Parsed results are patient health data (medicines, diseases,
+symptoms), so the SQLite tier is only used when a path is given.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lru import LRUCache
+
+class ParseCache:
+    """Memory LRU + SQLite cache keyed on normalized message, prompt version and deployment."""
+
+    def __init__(self, path=None, ttl_seconds=7 * 24 * 3600, maxsize=1024):
+        """
+        Initialize cache tiers.
+
+        Args:
+            path: SQLite file for the persistent tier, or None for memory only
+            ttl_seconds: Lifetime of an entry in both tiers
+            maxsize: Maximum entries in the memory tier
+        """
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(maxsize)
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(message):
+        """Lowercase, collapse whitespace and drop trailing punctuation."""
+        normalized = re.sub(r'\s+', ' ', message.lower()).strip()
+        return normalized.rstrip('.!?, ')
+
+    def make_key(self, message, prompt_version, deployment):
+        """Build the cache key for a message under a given prompt and model."""
+        raw = f"{prompt_version}|{deployment}|{self.normalize(message)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a parsed result.
+
+        Returns:
+            Fresh copy of the cached dict, or None on miss
+        """
+        parsed = self._memory_get(key)
+        if parsed is None and self._db is not None:
+            parsed = self._disk_get(key)
+        if parsed is None:
+            self.misses += 1
+        return parsed
+
+    async def aget(self, key):
+        """get() for event-loop callers: the SQLite lookup runs in a worker thread."""
+        parsed = self._memory_get(key)
+        if parsed is None and self._db is not None:
+            parsed = await asyncio.to_thread(self._disk_get, key)
+        if parsed is None:
+            self.misses += 1
+        return parsed
+
+    def set(self, key, parsed):
+        """Store a parsed result in both tiers."""
+        value, expires_at = self._memory_set(key, parsed)
+        if self._db is not None:
+            self._disk_set(key, value, expires_at)
+
+    async def aset(self, key, parsed):
+        """set() for event-loop callers: the SQLite write runs in a worker thread."""
+        value, expires_at = self._memory_set(key, parsed)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def _memory_get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            return None
+        self.hits_memory += 1
+        return json.loads(value)
+
+    def _disk_get(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM parse_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        self.hits_disk += 1
+        self.memory.set(key, row[0], row[1])
+        return json.loads(row[0])
+
+    def _memory_set(self, key, parsed):
+        value = json.dumps(parsed)
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.set(key, value, expires_at)
+        return value, expires_at
+
+    def _disk_set(self, key, value, expires_at):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            self._db.commit()
+
+    def purge_expired(self):
+        """Delete expired rows from the persistent tier."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM parse_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def stats(self):
+        """Return hit/miss counters and overall hit rate."""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory)
+        }
@@ -1,4 +1,5 @@
 from ai.ai_layer import parse_user_message, explain_symptom
+from ai.interaction_engine import InteractionEngine
 from quantum.run_quantum import run_quantum_engine
 
 def run_pipeline(user_message: str):
@@ -6,22 +7,7 @@ def run_pipeline(user_message: str):
     parsed = parse_user_message(user_message)
 
     # 2. Prepare quantum input
-    drugs = [m["name"] for m in parsed["medicines"]]
-    dosage = {m["name"]: float(m["dose_mg"]) / 1000 for m in parsed["medicines"]}
-
-    timing_map = {"morning": 0.2, "afternoon": 0.5, "night": 0.8}
-    timing = {m["name"]: timing_map[m["time"]] for m in parsed["medicines"]}
-
-    interactions = {}
-    patient_modifier = 1.3
-
-    quantum_input = {
-        "drugs": drugs,
-        "dosage": dosage,
-        "timing": timing,
-        "interactions": interactions,
-        "patient_modifier": patient_modifier
-    }
+    quantum_input = InteractionEngine().build_quantum_input(parsed)
 
     # 3. Quantum
     quantum_result = run_quantum_engine(quantum_input, use_quantum=True)
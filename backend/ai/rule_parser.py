@@ -0,0 +1,205 @@
+"""
+Rule-Based Parser for QuraAI
+
+Deterministic fast path for parse_user_message. Handles the common
+"I have X. I take Y 500mg in the morning. I feel Z." messages with compiled
+patterns and a small lexicon, and reports a confidence score so only
+ambiguous messages go to Azure OpenAI.
+"""
+
+import re
+from interaction_engine import InteractionEngine
+
+# Surface form -> canonical name
+DRUG_LEXICON = {
+    'metformin': 'Metformin',
+    'lisinopril': 'Lisinopril',
+    'paracetamol': 'Paracetamol',
+    'acetaminophen': 'Acetaminophen',
+    'ibuprofen': 'Ibuprofen',
+    'aspirin': 'Aspirin',
+    'atorvastatin': 'Atorvastatin',
+    'simvastatin': 'Simvastatin',
+    'amlodipine': 'Amlodipine',
+    'losartan': 'Losartan',
+    'metoprolol': 'Metoprolol',
+    'hydrochlorothiazide': 'Hydrochlorothiazide',
+    'omeprazole': 'Omeprazole',
+    'levothyroxine': 'Levothyroxine',
+    'glipizide': 'Glipizide',
+    'insulin': 'Insulin',
+    'warfarin': 'Warfarin',
+    'amoxicillin': 'Amoxicillin',
+    'cetirizine': 'Cetirizine',
+    'sertraline': 'Sertraline',
+    'gabapentin': 'Gabapentin',
+    'prednisone': 'Prednisone',
+}
+
+DISEASE_LEXICON = {
+    'diabetes': 'diabetes',
+    'type 2 diabetes': 'type 2 diabetes',
+    'type 1 diabetes': 'type 1 diabetes',
+    'hypertension': 'hypertension',
+    'high blood pressure': 'hypertension',
+    'high cholesterol': 'high cholesterol',
+    'asthma': 'asthma',
+    'arthritis': 'arthritis',
+    'hypothyroidism': 'hypothyroidism',
+    'migraine': 'migraine',
+    'depression': 'depression',
+    'anxiety': 'anxiety',
+    'acid reflux': 'acid reflux',
+    'gerd': 'GERD',
+    'heart disease': 'heart disease',
+}
+
+SYMPTOM_LEXICON = {
+    'dizziness': 'dizziness',
+    'dizzy': 'dizziness',
+    'lightheaded': 'dizziness',
+    'nausea': 'nausea',
+    'nauseous': 'nausea',
+    'headache': 'headache',
+    'headaches': 'headache',
+    'fatigue': 'fatigue',
+    'tired': 'fatigue',
+    'stomach pain': 'stomach pain',
+    'stomach ache': 'stomach pain',
+    'cough': 'cough',
+    'rash': 'rash',
+    'drowsy': 'drowsiness',
+    'drowsiness': 'drowsiness',
+    'sweating': 'sweating',
+    'shaky': 'shakiness',
+    'blurred vision': 'blurred vision',
+}
+
+# Phrasings the rules cannot interpret safely; such messages go to the LLM.
+# Negations and past use ("didn't take", "no headache", "used to take"),
+# hypotheticals and advice ("should I take", "can't take"), and any question
+NEGATION_PATTERN = re.compile(
+    r"n['\u2019]t\b|\?|\b(?:not|no|none|nor|without|no longer|cannot|dont|didnt|doesnt|havent|hasnt|"
+    r"cant|wont|stopped|quit|never|instead of|used to|forgot|forget|missed|skipped|allergic|allergy|"
+    r"should|could|would|might|must|if|whether|can i|may i|do i|shall i)\b"
+)
+SENTENCE_SPLIT = re.compile(r'[.;!?\n]+')
+MESSAGE_DOSE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:mg|milligrams?)\b')
+# Medicine-taking phrase and the word it applies to ("take xanax", "i'm on januvia")
+TAKING_OBJECT_PATTERN = re.compile(
+    r"\b(?:take|takes|taking|took|prescribed|using|i'm on|im on|i am on|been on)\s+"
+    r"(?:my |some |a |an |the |daily |also )?([a-z][a-z-]*)"
+)
+# Messages about someone else's health must not be recorded as the user's
+THIRD_PARTY_PATTERN = re.compile(
+    r'\b(?:(?:my|his|her|our)\s+(?:mother|mom|mum|father|dad|parents?|wife|husband|partner|son|daughter|'
+    r'child|children|kids?|baby|brother|sister|grandmother|grandma|grandfather|grandpa|aunt|uncle|'
+    r'friend|patient)|he|she)\b'
+)
+FILLER_PATTERN = re.compile(r'^(?:ok|okay|thanks|thank you|hi|hello|please help|help)$')
+
+
+def _alternation(words):
+    # Longest first so multi-word entries win over their prefixes
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+class RuleBasedParser:
+    """Lexicon and pattern extractor producing parse_user_message-shaped output."""
+
+    def __init__(self):
+        """Compile lexicon patterns and load time words from InteractionEngine."""
+        self.time_words = InteractionEngine().time_map
+        self.drug_pattern = re.compile(rf'\b({_alternation(DRUG_LEXICON)})\b')
+        self.disease_pattern = re.compile(rf'\b({_alternation(DISEASE_LEXICON)})\b')
+        self.symptom_pattern = re.compile(rf'\b({_alternation(SYMPTOM_LEXICON)})\b')
+        self.time_pattern = re.compile(rf'\b({_alternation(self.time_words)})\b')
+
+    def parse(self, user_message):
+        """
+        Extract diseases, medicines and symptom.
+
+        Args:
+            user_message: User's description of disease, medicines, and symptoms
+
+        Returns:
+            Tuple of (parsed dict in parse_user_message format, confidence 0-1)
+        """
+        text = user_message.lower()
+        parsed = {"diseases": [], "medicines": [], "symptom": ""}
+
+        if NEGATION_PATTERN.search(text) or THIRD_PARTY_PATTERN.search(text):
+            return parsed, 0.0
+
+        symptoms = []
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+        explained = 0
+        penalty = 1.0
+
+        for sentence in sentences:
+            hit = False
+
+            for match in self.disease_pattern.finditer(sentence):
+                disease = DISEASE_LEXICON[match.group(1)]
+                if disease not in parsed["diseases"]:
+                    parsed["diseases"].append(disease)
+                hit = True
+
+            for match in self.symptom_pattern.finditer(sentence):
+                symptom = SYMPTOM_LEXICON[match.group(1)]
+                if symptom not in symptoms:
+                    symptoms.append(symptom)
+                hit = True
+
+            # Medicine-taking language about a drug outside the lexicon
+            for match in TAKING_OBJECT_PATTERN.finditer(sentence):
+                if not self.drug_pattern.match(sentence, match.start(1)):
+                    return parsed, 0.0
+
+            drug_matches = list(self.drug_pattern.finditer(sentence))
+            claimed_doses = set()
+            for i, match in enumerate(drug_matches):
+                # Dose and time belong to the text up to the next drug mention
+                end = drug_matches[i + 1].start() if i + 1 < len(drug_matches) else len(sentence)
+                segment = sentence[match.end():end]
+                dose = MESSAGE_DOSE_PATTERN.search(segment)
+                times = self.time_pattern.findall(segment)
+
+                # Several time words ("morning and evening") need the LLM
+                if len(times) > 1:
+                    return parsed, 0.0
+                time_of_day = times[0] if times else ""
+
+                if dose:
+                    claimed_doses.add(match.end() + dose.start())
+                else:
+                    penalty *= 0.5
+                if not time_of_day:
+                    penalty *= 0.8
+
+                name = DRUG_LEXICON[match.group(1)]
+                if any(med["name"] == name for med in parsed["medicines"]):
+                    # Same drug mentioned twice: let the LLM reconcile
+                    penalty *= 0.5
+                else:
+                    parsed["medicines"].append({
+                        "name": name,
+                        "dose_mg": dose.group(1) if dose else "",
+                        "time": time_of_day
+                    })
+                hit = True
+
+            # A dose not attached to a known drug means our lexicon missed one
+            if any(dose.start() not in claimed_doses for dose in MESSAGE_DOSE_PATTERN.finditer(sentence)):
+                return parsed, 0.0
+
+            if hit or FILLER_PATTERN.match(sentence):
+                explained += 1
+
+        parsed["symptom"] = ", ".join(symptoms)
+
+        if not sentences or not (parsed["diseases"] or parsed["medicines"] or symptoms):
+            return parsed, 0.0
+
+        confidence = explained / len(sentences) * penalty
+        return parsed, round(confidence, 3)
@@ -0,0 +1,149 @@
+"""
+Semantic Cache for QuraAI
+
+Approximate-match cache for explain_symptom. Requests are turned into
+hashed character n-gram TF-IDF vectors kept in a NumPy matrix; a lookup is
+one vectorized cosine-similarity pass. Entries only match within the same
+risk level, medicines with their doses, and diseases; only the symptom text
+is matched approximately, above a conservative similarity threshold. No
+remote embedding service is used.
+"""
+
+import re
+import zlib
+import threading
+import numpy as np
+
+class SemanticCache:
+    """Nearest-neighbour cache over local character n-gram vectors."""
+
+    def __init__(self, capacity=1024, dim=4096, ngram=3, threshold=0.9):
+        """
+        Initialize empty cache.
+
+        Args:
+            capacity: Maximum entries; the least recently used is evicted
+            dim: Hashed feature dimension
+            ngram: Character n-gram length
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.capacity = capacity
+        self.dim = dim
+        self.ngram = ngram
+        self.threshold = threshold
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.group_ids = np.full(capacity, -1, dtype=np.int64)
+        self.values = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def describe(parsed_data):
+        """
+        Split a parsed request into its exact-match group and its fuzzy text.
+
+        Returns:
+            Tuple of (group key of sorted (name, dose) pairs and sorted diseases, symptom text)
+        """
+        def normalize(value):
+            return re.sub(r'\s+', ' ', str(value)).strip().lower()
+
+        # Doses compare as numbers of mg: "500", "500mg" and "500 mg" are one dose
+        medicines = sorted(
+            f"{normalize(m.get('name', ''))}:{re.sub(r'mg$', '', normalize(m.get('dose_mg', '')).replace(' ', ''))}"
+            for m in parsed_data.get("medicines", [])
+        )
+        diseases = sorted({normalize(d) for d in parsed_data.get("diseases", [])})
+        return f"{','.join(medicines)}|{','.join(diseases)}", str(parsed_data.get("symptom", ""))
+
+    def vectorize(self, text):
+        """Hashed character n-gram term counts (sublinear tf) over lowercased words."""
+        text = " " + re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip() + " "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if len(text) < self.ngram:
+            return vector
+        indices = [zlib.crc32(text[i:i + self.ngram].encode()) % self.dim
+                   for i in range(len(text) - self.ngram + 1)]
+        np.add.at(vector, indices, 1.0)
+        np.log1p(vector, out=vector)
+        return vector
+
+    @staticmethod
+    def _group_id(group):
+        # Stable 63-bit id so group filtering is a single array comparison
+        data = group.encode()
+        return (zlib.crc32(data) << 31) ^ zlib.adler32(data)
+
+    def _idf(self):
+        return np.log((1.0 + self.size) / (1.0 + self.doc_freq)) + 1.0
+
+    def get(self, parsed_data, risk_level):
+        """
+        Find a cached explanation for an equivalent request.
+
+        Returns:
+            Cached explanation or None
+        """
+        group, text = self.describe(parsed_data)
+        group_id = self._group_id(f"{risk_level}|{group}")
+        query = self.vectorize(text)
+
+        with self._lock:
+            candidates = np.flatnonzero(self.group_ids[:self.size] == group_id)
+            if len(candidates) == 0:
+                self.misses += 1
+                return None
+
+            idf = self._idf()
+            rows = self.vectors[candidates] * idf
+            q = query * idf
+            norms = np.linalg.norm(rows, axis=1) * np.linalg.norm(q)
+            similarity = (rows @ q) / np.maximum(norms, 1e-12)
+
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            index = candidates[best]
+            self._tick += 1
+            self.last_used[index] = self._tick
+            self.hits += 1
+            return self.values[index]
+
+    def set(self, parsed_data, risk_level, explanation):
+        """Store an explanation, evicting the least recently used entry when full."""
+        group, text = self.describe(parsed_data)
+        vector = self.vectorize(text)
+
+        with self._lock:
+            if self.size < self.capacity:
+                index = self.size
+                self.size += 1
+            else:
+                index = int(np.argmin(self.last_used))
+                self.doc_freq -= self.vectors[index] > 0
+
+            self.vectors[index] = vector
+            self.doc_freq += vector > 0
+            self.group_ids[index] = self._group_id(f"{risk_level}|{group}")
+            self.values[index] = explanation
+            self._tick += 1
+            self.last_used[index] = self._tick
+
+    def stats(self):
+        """Return hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.size
+        }
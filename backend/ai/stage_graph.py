@@ -0,0 +1,67 @@
+"""
+Stage Graph for QuraAI
+
+Runs the async stages of an analysis pipeline as a small dependency graph:
+each stage starts as soon as the stages it depends on have finished, so
+independent LLM and database calls overlap instead of running back to back.
+"""
+
+import time
+import asyncio
+
+class StageGraph:
+    """Dependency graph of named async stages with per-stage timings."""
+
+    def __init__(self):
+        """Initialize empty graph."""
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, func, depends_on=()):
+        """
+        Register a stage.
+
+        Args:
+            name: Unique stage name; its result is stored under this key
+            func: Async callable receiving the results of depends_on as keyword arguments
+            depends_on: Names of stages whose results this stage needs
+        """
+        self.stages[name] = (func, tuple(depends_on))
+        return self
+
+    async def _run_stage(self, name, tasks):
+        func, depends_on = self.stages[name]
+        inputs = {}
+        for dependency in depends_on:
+            inputs[dependency] = await tasks[dependency]
+
+        start = time.perf_counter()
+        try:
+            return await func(**inputs)
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def run(self, deadline_seconds=None):
+        """
+        Run all stages, overlapping those without mutual dependencies.
+
+        Args:
+            deadline_seconds: Overall time budget for the whole graph
+
+        Returns:
+            Dict of stage name to result
+
+        Raises:
+            asyncio.TimeoutError: The graph did not finish before the deadline
+        """
+        tasks = {}
+        for name in self.stages:
+            tasks[name] = asyncio.ensure_future(self._run_stage(name, tasks))
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks.values()), deadline_seconds)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        return {name: task.result() for name, task in tasks.items()}
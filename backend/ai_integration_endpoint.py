@@ -1,5 +1,8 @@
 # Add this endpoint to main_api.py
 
+# Overall time budget for one /ai-analysis request (seconds)
+AI_ANALYSIS_DEADLINE_SECONDS = float(os.getenv("AI_ANALYSIS_DEADLINE_SECONDS", "25"))
+
 @app.post("/ai-analysis")
 async def ai_analysis(request: ChatMessageRequest, user: dict = Depends(get_current_user)):
     """AI + Quantum + Explainability analysis endpoint."""
@@ -7,70 +10,94 @@ async def ai_analysis(request: ChatMessageRequest, user: dict = Depends(get_curr
         # Import your existing components
         sys.path.append(os.path.join(os.path.dirname(__file__), 'ai'))
         sys.path.append(os.path.join(os.path.dirname(__file__), 'quantum'))
-        
-        from ai_layer import parse_user_message, explain_symptom
+
+        from ai_layer import aparse_user_message, aexplain_symptom
         from interaction_engine import InteractionEngine
-        from drug_interaction_analyzer import DrugInteractionAnalyzer
-        from qubo import qubo_energy
-        
-        # Get user medicines
-        user_medicines = await get_medicines(user)
-        
+        from drug_interaction_analyzer import get_analyzer
+        from stage_graph import StageGraph
+
+        # Get user medicines (independent of parsing)
+        async def load_medicines():
+            return await get_medicines(user)
+
         # Step 1: AI parsing
-        parsed_data = parse_user_message(request.message)
-        
-        # Step 2: Convert to quantum format
-        engine = InteractionEngine()
-        medicine_data = {
-            "medicines": user_medicines if user_medicines else [
-                {"name": med["name"], "dose": f"{med['dose_mg']}mg", "time": "morning"}
-                for med in parsed_data.get("medicines", [])
-            ]
-        }
-        quantum_data = engine.process_medicines(medicine_data)
-        
-        # Step 3: Quantum analysis
-        variables = quantum_data.get("variables", {})
-        if variables:
-            # Simple quantum risk calculation
-            total_risk = sum(variables.values()) * 0.3
-            risk_level = "high" if total_risk > 0.7 else "medium" if total_risk > 0.4 else "low"
-            safety_score = max(0, 100 - int(total_risk * 100))
-        else:
-            total_risk = 0.1
-            risk_level = "low"
-            safety_score = 95
-        
+        async def parse():
+            return await aparse_user_message(request.message)
+
+        # Steps 2-3: Convert to quantum format and score risk
+        async def score(medicines, parsed):
+            engine = InteractionEngine()
+            medicine_data = {
+                "medicines": medicines if medicines else [
+                    {"name": med["name"], "dose": f"{med['dose_mg']}mg", "time": "morning"}
+                    for med in parsed.get("medicines", [])
+                ]
+            }
+            quantum_data = engine.process_medicines(medicine_data)
+
+            variables = quantum_data.get("variables", {})
+            if variables:
+                # Simple quantum risk calculation
+                total_risk = sum(variables.values()) * 0.3
+                risk_level = "high" if total_risk > 0.7 else "medium" if total_risk > 0.4 else "low"
+                safety_score = max(0, 100 - int(total_risk * 100))
+            else:
+                total_risk = 0.1
+                risk_level = "low"
+                safety_score = 95
+
+            return {
+                "quantum_data": quantum_data,
+                "risk_analysis": {
+                    "safety_score": safety_score,
+                    "risk_level": risk_level,
+                    "risk_score": total_risk
+                }
+            }
+
         # Step 4: AI explanation
-        explanation = explain_symptom(parsed_data, risk_level)
-        
-        # Step 5: Drug interaction analysis
-        analyzer = DrugInteractionAnalyzer()
-        if user_medicines:
-            drug_explanation = analyzer.explain_medicine_usage(
-                parsed_data.get("diseases", ["general health"])[0] if parsed_data.get("diseases") else "general health",
-                user_medicines
+        async def explain(parsed, score):
+            return await aexplain_symptom(parsed, score["risk_analysis"]["risk_level"])
+
+        # Step 5: Drug interaction analysis (runs alongside steps 2-4)
+        async def explain_drugs(parsed, medicines):
+            if not medicines:
+                return "No medicines to analyze."
+            return await get_analyzer().aexplain_medicine_usage(
+                parsed.get("diseases", ["general health"])[0] if parsed.get("diseases") else "general health",
+                medicines
             )
-        else:
-            drug_explanation = "No medicines to analyze."
-        
+
+        graph = (
+            StageGraph()
+            .add("medicines", load_medicines)
+            .add("parsed", parse)
+            .add("score", score, depends_on=("medicines", "parsed"))
+            .add("explanation", explain, depends_on=("parsed", "score"))
+            .add("drug_explanation", explain_drugs, depends_on=("parsed", "medicines"))
+        )
+        results = await graph.run(deadline_seconds=AI_ANALYSIS_DEADLINE_SECONDS)
+
         return {
             "success": True,
-            "parsed_input": parsed_data,
-            "quantum_data": quantum_data,
-            "risk_analysis": {
-                "safety_score": safety_score,
-                "risk_level": risk_level,
-                "risk_score": total_risk
-            },
-            "ai_explanation": explanation,
-            "drug_explanation": drug_explanation,
+            "parsed_input": results["parsed"],
+            "quantum_data": results["score"]["quantum_data"],
+            "risk_analysis": results["score"]["risk_analysis"],
+            "ai_explanation": results["explanation"],
+            "drug_explanation": results["drug_explanation"],
+            "timings": graph.timings,
             "timestamp": datetime.now().isoformat()
         }
-        
+
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "error": "Analysis deadline exceeded",
+            "explanation": "Unable to process your request at this time."
+        }
     except Exception as e:
         return {
             "success": False,
             "error": str(e),
             "explanation": "Unable to process your request at this time."
-        }
\ No newline at end of file
+        }
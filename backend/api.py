@@ -5,21 +5,31 @@ Connects frontend to Cosmos DB with all required endpoints
 
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional, Dict, Any
 import os
 import sys
+import hmac
+import json
 import uuid
 from datetime import datetime
 
 # Add paths
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from auth.auth_manager import AuthManager
-from azure.cosmos import CosmosClient
+from auth.auth_threads import run_auth_call
+import data_access as db
+from explanation_rules import general_explanation, contextual_explanation
+from ai.ai_layer import aparse_user_message, astream_explain_symptom, parse_cache_stats, aprewarm as prewarm_ai, aclose as close_ai
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Shared secret for /metrics (sent as X-Metrics-Token); unset disables the endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 app = FastAPI(title="QuraAI API", version="1.0.0")
 
 # CORS middleware for frontend
@@ -31,18 +41,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
+# Initialize services (user data goes through the async data_access layer;
+# AuthManager is synchronous and runs in the threadpool, or on the auth
+# threads for calls that hash passwords)
 auth_manager = AuthManager()
-cosmos_client = CosmosClient(os.getenv("COSMOS_DB_ENDPOINT"), os.getenv("COSMOS_DB_KEY"))
-database = cosmos_client.get_database_client("QureAiDB")
 
-# Containers
-users_container = database.get_container_client("users")
-health_profiles_container = database.get_container_client("health_profiles")
-medicines_container = database.get_container_client("medicines")
-medical_conditions_container = database.get_container_client("medical_conditions")
-risk_assessments_container = database.get_container_client("risk_assessments")
-chat_sessions_container = database.get_container_client("chat_sessions")
+@app.on_event("startup")
+async def startup():
+    await db.check_partition_keys()
+    db.write_queue.start()
+    auth_manager.start_session_sweeper()
+    await prewarm_ai()
+
+@app.on_event("shutdown")
+async def shutdown():
+    auth_manager.stop_session_sweeper()
+    await close_ai()
+    await db.write_queue.drain()
+    await db.close()
+
+@app.middleware("http")
+async def request_scoped_loads(request, call_next):
+    # Repeated loads of the same user data within one request hit Cosmos once
+    with db.request_scope():
+        return await call_next(request)
 
 # Models
 class SignupRequest(BaseModel):
@@ -78,7 +100,10 @@ async def get_current_user(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Missing authorization")
     
     session_token = authorization.replace("Bearer ", "")
-    result = auth_manager.verify_session(session_token)
+    # Hot sessions are answered from the cache without a thread hop
+    result = auth_manager.cached_session(session_token)
+    if result is None:
+        result = await run_in_threadpool(auth_manager.verify_session, session_token, False)
     
     if not result["valid"]:
         raise HTTPException(status_code=401, detail="Invalid session")
@@ -86,26 +111,12 @@ async def get_current_user(authorization: str = Header(None)):
     return result
 
 # Helper functions
-def generate_contextual_explanation(message: str, risk_level: str, user_health_context: dict) -> str:
+def generate_contextual_explanation(message: str, risk_level: str, user_health_context: db.HealthContext) -> str:
     message_lower = message.lower()
-    user_medicines = user_health_context.get('medicines', [])
-    user_conditions = user_health_context.get('conditions', [])
-    has_health_context = bool(user_medicines or user_conditions)
     
-    if not has_health_context:
+    if not user_health_context:
         # General health assistant
-        if any(word in message_lower for word in ['headache', 'head pain']):
-            base_explanation = "Headaches can happen for many reasons such as stress, dehydration, lack of sleep, or tension."
-        elif any(word in message_lower for word in ['stomach', 'nausea', 'sick']):
-            base_explanation = "Stomach discomfort may result from dietary changes, stress, or minor digestive issues."
-        elif any(word in message_lower for word in ['tired', 'fatigue', 'exhausted']):
-            base_explanation = "Fatigue often occurs due to insufficient sleep, stress, or changes in routine."
-        elif any(word in message_lower for word in ['chest', 'heart', 'breathing']):
-            base_explanation = "Chest sensations can be related to anxiety, physical exertion, or muscle tension."
-        elif any(word in message_lower for word in ['dizzy', 'lightheaded']):
-            base_explanation = "Dizziness can be caused by dehydration, standing up quickly, or low blood sugar."
-        else:
-            base_explanation = "Your symptoms may be related to common factors like stress, lifestyle changes, or minor health variations."
+        base_explanation = general_explanation(message_lower)
         
         if risk_level == "low":
             return f"{base_explanation} This appears to be a minor concern. Try rest, hydration, and stress management techniques."
@@ -116,8 +127,8 @@ def generate_contextual_explanation(message: str, risk_level: str, user_health_c
     
     else:
         # Contextual assistant with user's medicines/conditions
-        medicine_names = [med.get('name', '') for med in user_medicines]
-        condition_names = [cond.get('name', '') for cond in user_conditions]
+        medicine_names = list(user_health_context.medicine_names)
+        condition_names = list(user_health_context.condition_names)
         
         context_intro = ""
         if medicine_names:
@@ -127,24 +138,7 @@ def generate_contextual_explanation(message: str, risk_level: str, user_health_c
         elif condition_names:
             context_intro = f"Given your {', '.join(condition_names[:2])}"
         
-        if any(word in message_lower for word in ['dizzy', 'lightheaded']):
-            if any('metformin' in med.lower() for med in medicine_names):
-                explanation = f"{context_intro}, dizziness can sometimes occur, especially if blood sugar drops."
-            elif any('lisinopril' in med.lower() for med in medicine_names):
-                explanation = f"{context_intro}, dizziness may occur when standing up quickly due to blood pressure changes."
-            else:
-                explanation = f"{context_intro}, dizziness could be related to your current medications or condition."
-        elif any(word in message_lower for word in ['stomach', 'nausea']):
-            if any('metformin' in med.lower() for med in medicine_names):
-                explanation = f"{context_intro}, stomach upset is a known side effect, especially when starting treatment."
-            else:
-                explanation = f"{context_intro}, stomach discomfort could be related to your medications or dietary changes."
-        elif any(word in message_lower for word in ['tired', 'fatigue']):
-            explanation = f"{context_intro}, fatigue can sometimes be related to your current treatment or condition management."
-        elif any(word in message_lower for word in ['headache']):
-            explanation = f"{context_intro}, headaches may be related to your current medications or condition."
-        else:
-            explanation = f"{context_intro}, your symptoms could be related to your current treatment plan."
+        explanation = f"{context_intro}, {contextual_explanation(message_lower, medicine_names)}"
         
         if risk_level == "low":
             return f"{explanation} Your current risk appears low based on your profile."
@@ -153,53 +147,59 @@ def generate_contextual_explanation(message: str, risk_level: str, user_health_c
         else:
             return f"{explanation} Given your medical history, you should consult your doctor about these symptoms."
 
-async def get_user_health_context(user_id: str) -> dict:
+def score_message(message: str):
+    quantum_score = 0.2 + (len(message) % 10) * 0.05
+    
+    if quantum_score < 0.3:
+        risk_level = "low"
+    elif quantum_score < 0.6:
+        risk_level = "medium"
+    else:
+        risk_level = "high"
+    
+    quantum_data = {
+        "status": "processed",
+        "risk_score": quantum_score,
+        "algorithm": "QAOA"
+    }
+    return risk_level, quantum_data
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def get_user_health_context(user_id: str) -> db.HealthContext:
     try:
-        medicines_query = "SELECT * FROM c WHERE c.userId = @userId"
-        medicines = list(medicines_container.query_items(
-            query=medicines_query,
-            parameters=[{"name": "@userId", "value": user_id}],
-            enable_cross_partition_query=True
-        ))
-        
-        conditions_query = "SELECT * FROM c WHERE c.userId = @userId"
-        conditions = list(medical_conditions_container.query_items(
-            query=conditions_query,
-            parameters=[{"name": "@userId", "value": user_id}],
-            enable_cross_partition_query=True
-        ))
-        
-        return {'medicines': medicines, 'conditions': conditions}
+        return await db.load_health_context(user_id)
     except:
-        return {'medicines': [], 'conditions': []}
+        return db.HealthContext()
 
 # Auth endpoints
 @app.post("/auth/signup")
 async def signup(request: SignupRequest):
-    result = auth_manager.signup(request.email, request.password, request.full_name)
+    result = await run_auth_call(auth_manager.signup, request.email, request.password, request.full_name)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     return result
 
 @app.post("/auth/login")
 async def login(request: LoginRequest):
-    result = auth_manager.login(request.email, request.password)
+    result = await run_auth_call(auth_manager.login, request.email, request.password)
     if not result["success"]:
         raise HTTPException(status_code=401, detail=result["message"])
     return result
 
 @app.post("/auth/logout")
-async def logout(user: dict = Depends(get_current_user)):
-    return {"message": "Logged out successfully"}
+async def logout(user: dict = Depends(get_current_user), authorization: str = Header(None)):
+    result = await run_in_threadpool(auth_manager.logout, authorization.replace("Bearer ", ""))
+    return {"message": result["message"]}
 
 # Health Profile endpoints
 @app.get("/profile")
 async def get_profile(user: dict = Depends(get_current_user)):
-    try:
-        profile = health_profiles_container.read_item(user["user_id"], user["user_id"])
-        return profile
-    except:
+    profile = await db.get_profile(user["user_id"])
+    if profile is None:
         return {"message": "Profile not found"}
+    return profile
 
 @app.post("/profile")
 async def create_profile(request: HealthProfileRequest, user: dict = Depends(get_current_user)):
@@ -211,23 +211,14 @@ async def create_profile(request: HealthProfileRequest, user: dict = Depends(get
         "updated_at": datetime.now().isoformat()
     }
     
-    try:
-        health_profiles_container.create_item(profile_data)
+    if await db.save_profile(profile_data):
         return {"message": "Profile created successfully"}
-    except:
-        health_profiles_container.replace_item(user["user_id"], profile_data)
-        return {"message": "Profile updated successfully"}
+    return {"message": "Profile updated successfully"}
 
 # Medicine endpoints
 @app.get("/medicines")
 async def get_medicines(user: dict = Depends(get_current_user)):
-    query = "SELECT * FROM c WHERE c.userId = @userId"
-    medicines = list(medicines_container.query_items(
-        query=query,
-        parameters=[{"name": "@userId", "value": user["user_id"]}],
-        enable_cross_partition_query=True
-    ))
-    return medicines
+    return await db.list_medicines(user["user_id"])
 
 @app.post("/medicines")
 async def add_medicine(request: MedicineRequest, user: dict = Depends(get_current_user)):
@@ -239,13 +230,13 @@ async def add_medicine(request: MedicineRequest, user: dict = Depends(get_curren
         "created_at": datetime.now().isoformat()
     }
     
-    medicines_container.create_item(medicine_data)
+    await db.add_medicine(medicine_data)
     return {"message": "Medicine added successfully", "id": medicine_data["id"]}
 
 @app.delete("/medicines/{medicine_id}")
 async def delete_medicine(medicine_id: str, user: dict = Depends(get_current_user)):
     try:
-        medicines_container.delete_item(medicine_id, user["user_id"])
+        await db.delete_medicine(medicine_id, user["user_id"])
         return {"message": "Medicine deleted successfully"}
     except:
         raise HTTPException(status_code=404, detail="Medicine not found")
@@ -253,13 +244,7 @@ async def delete_medicine(medicine_id: str, user: dict = Depends(get_current_use
 # Medical Conditions endpoints
 @app.get("/conditions")
 async def get_conditions(user: dict = Depends(get_current_user)):
-    query = "SELECT * FROM c WHERE c.userId = @userId"
-    conditions = list(medical_conditions_container.query_items(
-        query=query,
-        parameters=[{"name": "@userId", "value": user["user_id"]}],
-        enable_cross_partition_query=True
-    ))
-    return conditions
+    return await db.list_conditions(user["user_id"])
 
 @app.post("/conditions")
 async def add_condition(condition: dict, user: dict = Depends(get_current_user)):
@@ -270,7 +255,7 @@ async def add_condition(condition: dict, user: dict = Depends(get_current_user))
         "created_at": datetime.now().isoformat()
     }
     
-    medical_conditions_container.create_item(condition_data)
+    await db.add_condition(condition_data)
     return {"message": "Condition added successfully"}
 
 # Risk Assessment endpoints
@@ -279,20 +264,20 @@ async def get_risk_assessment(user: dict = Depends(get_current_user)):
     try:
         medicines = await get_medicines(user)
         risk_score = min(95, max(60, 90 - len(medicines) * 5))
+        content_hash = db.regimen_hash(medicines)
         
         risk_data = {
-            "id": str(uuid.uuid4()),
+            "id": db.risk_assessment_id(user["user_id"], content_hash),
             "userId": user["user_id"],
             "overall_score": risk_score,
             "risk_level": "low" if risk_score > 80 else "medium" if risk_score > 60 else "high",
             "medicine_count": len(medicines),
+            "regimen_hash": content_hash,
             "last_updated": datetime.now().isoformat()
         }
         
-        try:
-            risk_assessments_container.create_item(risk_data)
-        except:
-            pass
+        # Only persisted (in the background) when the regimen changed
+        db.risk_store.record(risk_data, content_hash)
         
         return risk_data
     except Exception as e:
@@ -303,20 +288,7 @@ async def get_risk_assessment(user: dict = Depends(get_current_user)):
 async def analyze_health_message(request: ChatMessageRequest, user: dict = Depends(get_current_user)):
     try:
         user_health_context = await get_user_health_context(user["user_id"])
-        quantum_score = 0.2 + (len(request.message) % 10) * 0.05
-        
-        if quantum_score < 0.3:
-            risk_level = "low"
-        elif quantum_score < 0.6:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
-        
-        quantum_data = {
-            "status": "processed",
-            "risk_score": quantum_score,
-            "algorithm": "QAOA"
-        }
+        risk_level, quantum_data = score_message(request.message)
         
         explanation = generate_contextual_explanation(request.message, risk_level, user_health_context)
         
@@ -336,21 +308,8 @@ async def analyze_health_message(request: ChatMessageRequest, user: dict = Depen
 @app.post("/analyze-guest")
 async def analyze_health_message_guest(request: ChatMessageRequest):
     try:
-        user_health_context = {'medicines': [], 'conditions': []}
-        quantum_score = 0.2 + (len(request.message) % 10) * 0.05
-        
-        if quantum_score < 0.3:
-            risk_level = "low"
-        elif quantum_score < 0.6:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
-        
-        quantum_data = {
-            "status": "processed",
-            "risk_score": quantum_score,
-            "algorithm": "QAOA"
-        }
+        user_health_context = db.HealthContext()
+        risk_level, quantum_data = score_message(request.message)
         
         explanation = generate_contextual_explanation(request.message, risk_level, user_health_context)
         
@@ -367,6 +326,30 @@ async def analyze_health_message_guest(request: ChatMessageRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/stream")
+async def analyze_health_message_stream(request: ChatMessageRequest, user: dict = Depends(get_current_user)):
+    """Server-Sent Events: parsed data and risk first, then the explanation as it is generated."""
+    async def events():
+        try:
+            parsed = await aparse_user_message(request.message)
+            yield sse_event("parsed", parsed)
+            
+            risk_level, quantum_data = score_message(request.message)
+            yield sse_event("risk", {"risk": risk_level, "quantum": quantum_data})
+            
+            async for token in astream_explain_symptom(parsed, risk_level):
+                yield sse_event("token", {"text": token})
+            
+            yield sse_event("done", {"timestamp": datetime.now().isoformat()})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Chat endpoints
 @app.post("/chat")
 async def chat_message(request: ChatMessageRequest, user: dict = Depends(get_current_user)):
@@ -380,10 +363,8 @@ async def chat_message(request: ChatMessageRequest, user: dict = Depends(get_cur
         "timestamp": datetime.now().isoformat()
     }
     
-    try:
-        chat_sessions_container.create_item(chat_data)
-    except:
-        pass
+    # Persisted in the background; the reply does not wait on Cosmos
+    db.add_chat_message(chat_data)
     
     return {"response": response}
 
@@ -406,6 +387,19 @@ async def get_dashboard_data(user: dict = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def metrics(x_metrics_token: str = Header(None)):
+    # Internal counters: only for holders of METRICS_TOKEN, and hidden entirely without one
+    if not METRICS_TOKEN or not x_metrics_token or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "data": db.metrics(),
+        "sessions": auth_manager.session_cache.stats(),
+        "password_hashing": auth_manager.password_hasher.stats(),
+        "sessions_purged": auth_manager.sessions_purged,
+        "ai": parse_cache_stats()
+    }
+
 @app.get("/")
 async def root():
     return {"message": "QuraAI API is running", "version": "1.0.0"}
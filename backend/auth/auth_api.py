@@ -4,6 +4,7 @@ FastAPI routes for signup, login, logout, and session verification
 """
 
 from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 import os
@@ -12,6 +13,7 @@ import sys
 # Add backend to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from auth.auth_manager import AuthManager
+from auth.auth_threads import run_auth_call
 
 app = FastAPI(title="QuraAI Authentication API")
 auth_manager = AuthManager()
@@ -37,7 +39,7 @@ class AuthResponse(BaseModel):
 @app.post("/signup", response_model=AuthResponse)
 async def signup(request: SignupRequest):
     """Create new user account."""
-    result = auth_manager.signup(request.email, request.password, request.full_name)
+    result = await run_auth_call(auth_manager.signup, request.email, request.password, request.full_name)
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -47,7 +49,7 @@ async def signup(request: SignupRequest):
 @app.post("/login", response_model=AuthResponse)
 async def login(request: LoginRequest):
     """Authenticate user and create session."""
-    result = auth_manager.login(request.email, request.password)
+    result = await run_auth_call(auth_manager.login, request.email, request.password)
     
     if not result["success"]:
         raise HTTPException(status_code=401, detail=result["message"])
@@ -61,7 +63,7 @@ async def logout(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
     
     session_token = authorization.replace("Bearer ", "")
-    result = auth_manager.logout(session_token)
+    result = await run_in_threadpool(auth_manager.logout, session_token)
     
     return {"message": result["message"]}
 
@@ -72,7 +74,10 @@ async def verify_session(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
     
     session_token = authorization.replace("Bearer ", "")
-    result = auth_manager.verify_session(session_token)
+    # Hot sessions are answered from the cache without a thread hop
+    result = auth_manager.cached_session(session_token)
+    if result is None:
+        result = await run_in_threadpool(auth_manager.verify_session, session_token, False)
     
     if not result["valid"]:
         raise HTTPException(status_code=401, detail=result["message"])
@@ -95,7 +100,10 @@ async def get_current_user(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
     
     session_token = authorization.replace("Bearer ", "")
-    result = auth_manager.verify_session(session_token)
+    # Hot sessions are answered from the cache without a thread hop
+    result = auth_manager.cached_session(session_token)
+    if result is None:
+        result = await run_in_threadpool(auth_manager.verify_session, session_token, False)
     
     if not result["valid"]:
         raise HTTPException(status_code=401, detail=result["message"])
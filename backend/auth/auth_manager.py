@@ -4,64 +4,268 @@ Handles user signup, login, and session management with Cosmos DB
 """
 
 import os
+import sys
 import hashlib
+import time
 import secrets
 import uuid
+import threading
 from datetime import datetime, timedelta
-from azure.cosmos import CosmosClient
+from azure.core import MatchConditions
+from azure.cosmos import CosmosClient, PartitionKey
+from azure.cosmos.exceptions import (
+    CosmosResourceNotFoundError, CosmosResourceExistsError, CosmosAccessConditionFailedError
+)
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from session_cache import SessionCache
+from password_hasher import PasswordHasher
+
 load_dotenv()
 
+# Verified sessions are trusted in-process for this long (seconds); other
+# processes see a logout or deactivation once their entry expires
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+
+# Sessions are keyed by sha256(token) as both id and partition key (/id)
+SESSIONS_CONTAINER_NAME = os.getenv("SESSIONS_CONTAINER_NAME", "user_sessions")
+
+# Session lifetime; also the document TTL, so Cosmos deletes expired sessions itself
+SESSION_LIFETIME_SECONDS = int(os.getenv("SESSION_LIFETIME_SECONDS", str(7 * 24 * 3600)))
+
+# Oldest sessions beyond this many per user are revoked at login
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "5"))
+
+# Attempts at a conditional user-document update before giving up to a concurrent writer
+USER_UPDATE_MAX_ATTEMPTS = int(os.getenv("USER_UPDATE_MAX_ATTEMPTS", "5"))
+
+# Background purge of expired/inactive sessions (0 disables the sweeper)
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "3600"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+
+def session_doc_id(session_token: str) -> str:
+    """Document id and partition key of a session; the raw token is never stored."""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+# email -> userId lookup documents, keyed by sha256(normalized email) as id and partition key
+EMAIL_INDEX_CONTAINER_NAME = os.getenv("EMAIL_INDEX_CONTAINER_NAME", "user_email_index")
+
+# Migration switch: while on, emails missing from the index are looked up
+# with the cross-partition query (and backfilled). "auto" keeps it on until
+# the backfill (python auth_manager.py --backfill-email-index) has recorded
+# completion in the index; "true" and "false" override that
+EMAIL_INDEX_LEGACY_FALLBACK = os.getenv("EMAIL_INDEX_LEGACY_FALLBACK", "auto").lower()
+
+# Index document written once every existing user has an entry (never a valid email hash)
+EMAIL_INDEX_BACKFILL_MARKER_ID = "backfill-complete"
+
+# An index entry without a user may belong to a signup still in progress; it
+# is only treated as abandoned (and taken over) once it is this old
+EMAIL_CLAIM_GRACE_SECONDS = float(os.getenv("EMAIL_CLAIM_GRACE_SECONDS", "300"))
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def email_doc_id(email: str) -> str:
+    """Document id and partition key of an email index entry."""
+    return hashlib.sha256(normalize_email(email).encode()).hexdigest()
+
 class AuthManager:
     """Handles user authentication with Cosmos DB."""
     
-    def __init__(self):
-        """Initialize Cosmos DB connection."""
-        self.client = CosmosClient(
-            os.getenv("COSMOS_DB_ENDPOINT"),
-            os.getenv("COSMOS_DB_KEY")
-        )
-        self.database = self.client.get_database_client(os.getenv("COSMOS_DB_NAME"))
+    def __init__(self, database=None):
+        """
+        Initialize Cosmos DB connection.
+        
+        Args:
+            database: Database proxy to use instead of the one configured by COSMOS_DB_* (e.g. in tests)
+        """
+        if database is None:
+            self.client = CosmosClient(
+                os.getenv("COSMOS_DB_ENDPOINT"),
+                os.getenv("COSMOS_DB_KEY")
+            )
+            database = self.client.get_database_client(os.getenv("COSMOS_DB_NAME"))
+        self.database = database
         self.users_container = self.database.get_container_client("users")
-        self.sessions_container = self.database.get_container_client("user_sessions")
+        self.sessions_container = self._open_sessions_container()
+        self.email_index_container = self._open_id_partitioned_container(EMAIL_INDEX_CONTAINER_NAME)
+        self.password_hasher = PasswordHasher()
+        self.session_cache = SessionCache(
+            maxsize=SESSION_CACHE_SIZE,
+            ttl_seconds=SESSION_CACHE_TTL_SECONDS,
+            negative_ttl_seconds=SESSION_CACHE_NEGATIVE_TTL_SECONDS
+        )
+        self._email_index_complete = False
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
+        self.sessions_purged = 0
+    
+    def _open_id_partitioned_container(self, name: str, **options):
+        """
+        Open (creating if needed) a container whose documents are point-read by id.
+        
+        Raises:
+            RuntimeError: If the container already exists with a partition key other than /id
+        """
+        container = self.database.create_container_if_not_exists(
+            id=name,
+            partition_key=PartitionKey(path="/id"),
+            **options
+        )
+        # An existing container keeps its partition key, and read_item(id, id) would 404 for every document
+        paths = container.read().get("partitionKey", {}).get("paths")
+        if paths != ["/id"]:
+            raise RuntimeError(f"Container {name} is partitioned on {paths}; recreate it with partition key /id")
+        return container
+    
+    def _open_sessions_container(self):
+        """Open the sessions container with TTL enabled (default_ttl=-1: per-document ttl only)."""
+        container = self._open_id_partitioned_container(SESSIONS_CONTAINER_NAME, default_ttl=-1)
+        try:
+            # Containers created before TTL support need it switched on
+            if "defaultTtl" not in container.read():
+                container = self.database.replace_container(
+                    container,
+                    partition_key=PartitionKey(path="/id"),
+                    default_ttl=-1
+                )
+        except Exception as e:
+            print(f"Could not enable TTL on {SESSIONS_CONTAINER_NAME}: {e}")
+        return container
     
     def hash_password(self, password: str) -> str:
-        """Hash password with salt."""
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return f"{salt}:{password_hash.hex()}"
+        """Hash password with salt (runs on the bounded hashing pool)."""
+        return self.password_hasher.hash(password)
     
     def verify_password(self, password: str, hashed: str) -> bool:
-        """Verify password against hash."""
+        """Verify password against hash (new or legacy format)."""
+        return self.password_hasher.verify(password, hashed)
+    
+    def _upgrade_password_hash(self, user: dict, password: str):
+        """Re-hash with the current parameters after a successful login; None if hashing failed."""
         try:
-            salt, stored_hash = hashed.split(':')
-            password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-            return password_hash.hex() == stored_hash
-        except:
+            return self.hash_password(password)
+        except Exception as e:
+            print(f"Password rehash failed for {user['userId']}: {e}")
+            return None
+    
+    def _update_user(self, user: dict, mutate):
+        """
+        Apply a change to a user document without overwriting concurrent writes.
+        
+        Args:
+            user: User document as last read (with its _etag)
+            mutate: Callable editing a user document in place, re-run on a fresh
+                    read after a conflict; returns False if there is nothing to save
+            
+        Returns:
+            The saved document, or the current one if mutate had nothing to save
+            
+        Raises:
+            CosmosAccessConditionFailedError: If every attempt lost to another writer
+        """
+        for attempt in range(USER_UPDATE_MAX_ATTEMPTS):
+            if mutate(user) is False:
+                return user
+            try:
+                return self.users_container.replace_item(
+                    user["id"],
+                    user,
+                    etag=user["_etag"],
+                    match_condition=MatchConditions.IfNotModified
+                )
+            except CosmosAccessConditionFailedError:
+                if attempt == USER_UPDATE_MAX_ATTEMPTS - 1:
+                    raise
+                user = self.users_container.read_item(user["id"], user["userId"])
+    
+    def _track_session(self, user: dict, session_id: str, password_hash: str = None) -> bool:
+        """
+        Record a new session on the user and revoke the oldest beyond MAX_SESSIONS_PER_USER.
+        
+        Args:
+            user: User document read at login
+            session_id: Id of the session document just created
+            password_hash: Upgraded hash to save, unless the password changed meanwhile
+            
+        Returns:
+            False if the account was deactivated meanwhile (the new session is revoked)
+        """
+        login_hash = user["password_hash"]
+        evicted = []
+        deactivated = []
+        
+        def add_session(doc):
+            # Derived from the fresh document on every attempt
+            evicted.clear()
+            deactivated.clear()
+            if not doc.get("is_active", True):
+                deactivated.append(True)
+                return False
+            sessions = doc.get("session_ids", []) + [session_id]
+            evicted.extend(sessions[:-MAX_SESSIONS_PER_USER] if MAX_SESSIONS_PER_USER > 0 else [])
+            doc["session_ids"] = sessions[len(evicted):]
+            if password_hash and doc.get("password_hash") == login_hash:
+                doc["password_hash"] = password_hash
+        
+        try:
+            self._update_user(user, add_session)
+        except Exception as e:
+            # The new session is already valid; the cap is enforced at the next login
+            print(f"Session tracking failed for {user['userId']}: {e}")
+            return True
+        
+        if deactivated:
+            self._delete_session(session_id)
             return False
+        for old_id in evicted:
+            self._delete_session(old_id)
+        return True
+    
+    def _delete_session(self, session_id: str):
+        """Delete a session document (missing is fine) and drop it from the cache."""
+        self.session_cache.invalidate(session_id)
+        try:
+            self.sessions_container.delete_item(session_id, session_id)
+        except CosmosResourceNotFoundError:
+            pass
     
     def signup(self, email: str, password: str, full_name: str) -> dict:
         """Create new user account."""
         try:
-            # Check if user exists
-            existing_user = self.get_user_by_email(email)
-            if existing_user:
+            # Users created before the email index only show up in the legacy query
+            if self._legacy_fallback_active() and self.get_user_by_email(email):
                 return {"success": False, "message": "Email already registered"}
             
-            # Create user
+            # Hash before claiming so the claim-to-create window stays short
+            password_hash = self.hash_password(password)
+            
+            # Claim the email: the index document doubles as the uniqueness check
             user_id = str(uuid.uuid4())
+            if not self._claim_email(email, user_id):
+                return {"success": False, "message": "Email already registered"}
+            
+            # Create user
             user_data = {
                 "id": user_id,
                 "userId": user_id,
-                "email": email.lower(),
-                "password_hash": self.hash_password(password),
+                "email": normalize_email(email),
+                "password_hash": password_hash,
                 "full_name": full_name,
                 "created_at": datetime.now().isoformat(),
                 "is_active": True
             }
             
-            self.users_container.create_item(user_data)
+            try:
+                self.users_container.create_item(user_data)
+            except Exception:
+                # Release the email so the user can retry
+                self.email_index_container.delete_item(email_doc_id(email), email_doc_id(email))
+                raise
             
             return {
                 "success": True,
@@ -91,16 +295,23 @@ class AuthManager:
             # Create session
             session_token = secrets.token_urlsafe(32)
             session_data = {
-                "id": str(uuid.uuid4()),
+                "id": session_doc_id(session_token),
                 "userId": user["userId"],
-                "session_token": session_token,
                 "created_at": datetime.now().isoformat(),
-                "expires_at": (datetime.now() + timedelta(days=7)).isoformat(),
-                "is_active": True
+                "expires_at": (datetime.now() + timedelta(seconds=SESSION_LIFETIME_SECONDS)).isoformat(),
+                "is_active": True,
+                "ttl": SESSION_LIFETIME_SECONDS
             }
             
             self.sessions_container.create_item(session_data)
             
+            # One user write covers both the session list and any password rehash
+            new_hash = None
+            if self.password_hasher.needs_rehash(user["password_hash"]):
+                new_hash = self._upgrade_password_hash(user, password)
+            if not self._track_session(user, session_data["id"], new_hash):
+                return {"success": False, "message": "Account is deactivated"}
+            
             return {
                 "success": True,
                 "message": "Login successful",
@@ -115,36 +326,43 @@ class AuthManager:
         except Exception as e:
             return {"success": False, "message": f"Login failed: {str(e)}"}
     
-    def verify_session(self, session_token: str) -> dict:
-        """Verify if session token is valid."""
+    def cached_session(self, session_token: str) -> dict:
+        """Cached verify_session result, or None on a miss; never touches Cosmos DB, so safe on the event loop."""
+        return self.session_cache.get(session_doc_id(session_token))
+    
+    def verify_session(self, session_token: str, check_cache: bool = True) -> dict:
+        """Verify if session token is valid (check_cache=False after a cached_session miss)."""
+        session_id = session_doc_id(session_token)
+        if check_cache:
+            cached = self.session_cache.get(session_id)
+            if cached is not None:
+                return cached
+        
         try:
-            # Query sessions by token
-            query = "SELECT * FROM c WHERE c.session_token = @token AND c.is_active = true"
-            sessions = list(self.sessions_container.query_items(
-                query=query,
-                parameters=[{"name": "@token", "value": session_token}],
-                enable_cross_partition_query=True
-            ))
-            
-            if not sessions:
-                return {"valid": False, "message": "Invalid session"}
+            session = self._read_session(session_token)
             
-            session = sessions[0]
+            if not session or not session.get("is_active", False):
+                result = {"valid": False, "message": "Invalid session"}
+                self.session_cache.set_invalid(session_id, result)
+                return result
             
             # Check expiration
             expires_at = datetime.fromisoformat(session["expires_at"])
             if datetime.now() > expires_at:
-                # Deactivate expired session
-                session["is_active"] = False
-                self.sessions_container.replace_item(session["id"], session)
-                return {"valid": False, "message": "Session expired"}
+                # Remove expired session now rather than waiting for its TTL
+                self._delete_session(session_id)
+                result = {"valid": False, "message": "Session expired"}
+                self.session_cache.set_invalid(session_id, result)
+                return result
             
             # Get user data
             user = self.get_user_by_id(session["userId"])
             if not user or not user.get("is_active", True):
-                return {"valid": False, "message": "User not found or inactive"}
+                result = {"valid": False, "message": "User not found or inactive"}
+                self.session_cache.set_invalid(session_id, result)
+                return result
             
-            return {
+            result = {
                 "valid": True,
                 "user_id": user["userId"],
                 "user_data": {
@@ -152,44 +370,198 @@ class AuthManager:
                     "full_name": user["full_name"]
                 }
             }
+            self.session_cache.set_valid(session_id, result, expires_at)
+            return result
             
         except Exception as e:
+            # Transient failures are not cached
             return {"valid": False, "message": f"Session verification failed: {str(e)}"}
     
     def logout(self, session_token: str) -> dict:
-        """Logout user by deactivating session."""
+        """Logout user by deleting the session."""
         try:
-            # Find and deactivate session
-            query = "SELECT * FROM c WHERE c.session_token = @token"
-            sessions = list(self.sessions_container.query_items(
-                query=query,
-                parameters=[{"name": "@token", "value": session_token}],
-                enable_cross_partition_query=True
-            ))
-            
-            if sessions:
-                session = sessions[0]
-                session["is_active"] = False
-                self.sessions_container.replace_item(session["id"], session)
+            self._delete_session(session_doc_id(session_token))
             
             return {"success": True, "message": "Logged out successfully"}
             
         except Exception as e:
             return {"success": False, "message": f"Logout failed: {str(e)}"}
     
+    def purge_sessions(self, limit: int = SESSION_SWEEP_BATCH_SIZE) -> int:
+        """
+        Delete expired and inactive sessions in bulk.
+        
+        Backstop for the document TTL, and cleanup for sessions written before
+        TTL was enabled. Runs off the request path, so the cross-partition
+        query here is acceptable.
+        
+        Returns:
+            Number of sessions deleted
+        """
+        query = "SELECT TOP @limit c.id FROM c WHERE c.is_active = false OR c.expires_at < @now"
+        stale = list(self.sessions_container.query_items(
+            query=query,
+            parameters=[{"name": "@limit", "value": limit}, {"name": "@now", "value": datetime.now().isoformat()}],
+            enable_cross_partition_query=True
+        ))
+        for session in stale:
+            self._delete_session(session["id"])
+        self.sessions_purged += len(stale)
+        return len(stale)
+    
+    def _sweep_loop(self, interval):
+        while not self._sweeper_stop.wait(interval):
+            try:
+                # A full batch means more may be waiting
+                purged = SESSION_SWEEP_BATCH_SIZE
+                while purged >= SESSION_SWEEP_BATCH_SIZE and not self._sweeper_stop.is_set():
+                    purged = self.purge_sessions()
+            except Exception as e:
+                print(f"Session sweep failed: {e}")
+    
+    def start_session_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL_SECONDS):
+        """Start the background session sweeper thread (idempotent)."""
+        if interval <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+        self._sweeper_stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,), name="session-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_session_sweeper(self):
+        """Signal the sweeper thread to exit."""
+        self._sweeper_stop.set()
+    
+    def _read_session(self, session_token: str) -> dict:
+        """Point-read a session by its token hash; None if it does not exist."""
+        doc_id = session_doc_id(session_token)
+        try:
+            return self.sessions_container.read_item(doc_id, doc_id)
+        except CosmosResourceNotFoundError:
+            return None
+    
+    def deactivate_user(self, user_id: str) -> dict:
+        """Deactivate a user account; their sessions stop verifying immediately in this process."""
+        try:
+            user = self.get_user_by_id(user_id)
+            if not user:
+                return {"success": False, "message": "User not found"}
+            
+            revoked = []
+            
+            def deactivate(doc):
+                doc["is_active"] = False
+                revoked[:] = doc.pop("session_ids", [])
+            
+            self._update_user(user, deactivate)
+            self.session_cache.invalidate_user(user_id)
+            for session_id in revoked:
+                self._delete_session(session_id)
+            
+            return {"success": True, "message": "User deactivated"}
+            
+        except Exception as e:
+            return {"success": False, "message": f"Deactivation failed: {str(e)}"}
+    
+    def _index_entry(self, user_id: str, email: str) -> dict:
+        return {
+            "id": email_doc_id(email),
+            "userId": user_id,
+            "created_at": datetime.now().isoformat()
+        }
+    
+    def _claim_email(self, email: str, user_id: str) -> bool:
+        """Create the email index entry; False if the email belongs to a user or a signup in progress."""
+        doc_id = email_doc_id(email)
+        try:
+            self.email_index_container.create_item(self._index_entry(user_id, email))
+            return True
+        except CosmosResourceExistsError:
+            pass
+        
+        try:
+            entry = self.email_index_container.read_item(doc_id, doc_id)
+        except CosmosResourceNotFoundError:
+            # Released by a failed signup in the meantime; lose rather than loop
+            return False
+        
+        # Between its claim and create_item a signup's entry has no user yet, so
+        # only an entry older than the grace period counts as abandoned
+        if time.time() - entry.get("_ts", 0) < EMAIL_CLAIM_GRACE_SECONDS or self.get_user_by_id(entry["userId"]):
+            return False
+        
+        try:
+            # Conditional on the entry we inspected: of two concurrent takeovers only one wins
+            self.email_index_container.replace_item(
+                doc_id,
+                self._index_entry(user_id, email),
+                etag=entry["_etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return True
+        except (CosmosAccessConditionFailedError, CosmosResourceNotFoundError):
+            return False
+    
     def get_user_by_email(self, email: str) -> dict:
-        """Get user by email."""
+        """Get user by email (point read through the email index)."""
         try:
+            doc_id = email_doc_id(email)
+            try:
+                entry = self.email_index_container.read_item(doc_id, doc_id)
+                return self.get_user_by_id(entry["userId"])
+            except CosmosResourceNotFoundError:
+                pass
+            
+            if not self._legacy_fallback_active():
+                return None
+            
             query = "SELECT * FROM c WHERE c.email = @email"
             users = list(self.users_container.query_items(
                 query=query,
-                parameters=[{"name": "@email", "value": email.lower()}],
+                parameters=[{"name": "@email", "value": normalize_email(email)}],
                 enable_cross_partition_query=True
             ))
-            return users[0] if users else None
+            if not users:
+                return None
+            
+            # Backfill so the next lookup is a point read
+            try:
+                self.email_index_container.upsert_item(self._index_entry(users[0]["userId"], email))
+            except Exception as e:
+                print(f"Email index backfill failed: {e}")
+            return users[0]
         except:
             return None
     
+    def _legacy_fallback_active(self) -> bool:
+        """Whether index misses still need the legacy query (see EMAIL_INDEX_LEGACY_FALLBACK)."""
+        if EMAIL_INDEX_LEGACY_FALLBACK != "auto":
+            return EMAIL_INDEX_LEGACY_FALLBACK == "true"
+        if not self._email_index_complete:
+            try:
+                self.email_index_container.read_item(EMAIL_INDEX_BACKFILL_MARKER_ID, EMAIL_INDEX_BACKFILL_MARKER_ID)
+                self._email_index_complete = True
+            except CosmosResourceNotFoundError:
+                pass
+        return not self._email_index_complete
+    
+    def backfill_email_index(self) -> int:
+        """Create index entries for every existing user, then record completion; returns the number written."""
+        count = 0
+        for user in self.users_container.query_items(
+            query="SELECT c.userId, c.email FROM c",
+            enable_cross_partition_query=True
+        ):
+            self.email_index_container.upsert_item(self._index_entry(user["userId"], user["email"]))
+            count += 1
+        # Only after every entry is written: from here on index misses are final
+        self.email_index_container.upsert_item({
+            "id": EMAIL_INDEX_BACKFILL_MARKER_ID,
+            "completed_at": datetime.now().isoformat(),
+            "users_indexed": count
+        })
+        self._email_index_complete = True
+        return count
+    
     def get_user_by_id(self, user_id: str) -> dict:
         """Get user by ID."""
         try:
@@ -201,6 +573,11 @@ class AuthManager:
 if __name__ == "__main__":
     auth = AuthManager()
     
+    if "--backfill-email-index" in sys.argv[1:]:
+        # One-off migration after deploying the email index
+        print(f"Email index backfilled for {auth.backfill_email_index()} users")
+        sys.exit(0)
+    
     print("Testing Authentication System")
     print("=" * 30)
     
@@ -0,0 +1,42 @@
+"""
+Auth Threads for QuraAI
+Dedicated threads for the auth calls that hash passwords (signup, login), so
+a burst of them queues on the event loop instead of occupying the shared
+threadpool that session checks and every other endpoint run on
+"""
+
+import os
+import sys
+import weakref
+import asyncio
+import anyio
+import anyio.to_thread
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from password_hasher import PASSWORD_HASH_WORKERS
+
+load_dotenv()
+
+# Threads for hashing auth calls; twice the hash workers keeps the workers
+# busy while other calls wait on Cosmos DB
+AUTH_MAX_THREADS = int(os.getenv("AUTH_MAX_THREADS", str(2 * PASSWORD_HASH_WORKERS)))
+
+# One limiter per event loop (anyio limiters are bound to the loop that uses them)
+_limiters = weakref.WeakKeyDictionary()
+
+def auth_limiter() -> anyio.CapacityLimiter:
+    """The auth-call limiter of the running event loop."""
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = anyio.CapacityLimiter(AUTH_MAX_THREADS)
+    return limiter
+
+async def run_auth_call(func, *args):
+    """
+    Run a blocking AuthManager call that hashes passwords on the auth threads.
+
+    Callers waiting for a thread wait on the event loop, not in a thread.
+    """
+    return await anyio.to_thread.run_sync(func, *args, limiter=auth_limiter())
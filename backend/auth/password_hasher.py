@@ -0,0 +1,116 @@
+"""
+Password Hashing for QuraAI
+PBKDF2 hashing on a bounded worker pool, with the parameters stored in each
+hash so the iteration count can change without invalidating old passwords
+"""
+
+import os
+import hmac
+import time
+import hashlib
+import secrets
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Iterations for new hashes; stored hashes with other counts are upgraded on login
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "100000"))
+
+# Worker threads (hashlib releases the GIL while hashing) and the cap on
+# hashes queued or running before callers are turned away
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Format of hashes written before parameters were stored ("salt:hash")
+LEGACY_ITERATIONS = 100000
+
+ALGORITHM = "pbkdf2_sha256"
+
+class HasherBusyError(Exception):
+    """Raised when the hashing pool stays full past the queue timeout."""
+
+class PasswordHasher:
+    """Bounded-pool PBKDF2 hasher with queue-time metrics."""
+
+    def __init__(self, iterations=PASSWORD_HASH_ITERATIONS, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS):
+        """
+        Initialize pool.
+
+        Args:
+            iterations: PBKDF2 iterations for new hashes
+            workers: Threads computing hashes
+            max_pending: Hashes allowed queued or running at once
+            queue_timeout: Seconds to wait for a pending slot before HasherBusyError
+        """
+        self.iterations = iterations
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pbkdf2")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._queue_times = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def _pbkdf2(self, password, salt, iterations, submitted):
+        with self._lock:
+            self._queue_times.append(time.monotonic() - submitted)
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+
+    def _run(self, password, salt, iterations):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise HasherBusyError("Password hashing is overloaded, try again shortly")
+        try:
+            future = self._executor.submit(self._pbkdf2, password, salt, iterations, time.monotonic())
+            result = future.result()
+            self.completed += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash password as pbkdf2_sha256$iterations$salt$hash."""
+        salt = secrets.token_hex(16)
+        digest = self._run(password, salt, self.iterations)
+        return f"{ALGORITHM}${self.iterations}${salt}${digest}"
+
+    @staticmethod
+    def parse(hashed: str):
+        """Return (iterations, salt, digest) for new-format or legacy hashes."""
+        if hashed.startswith(ALGORITHM + "$"):
+            _, iterations, salt, digest = hashed.split("$")
+            return int(iterations), salt, digest
+        salt, digest = hashed.split(":")
+        return LEGACY_ITERATIONS, salt, digest
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Check password against a stored hash of either format."""
+        try:
+            iterations, salt, digest = self.parse(hashed)
+        except ValueError:
+            return False
+        return hmac.compare_digest(self._run(password, salt, iterations), digest)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if the hash is legacy-format or uses a different iteration count."""
+        return not hashed.startswith(ALGORITHM + "$") or self.parse(hashed)[0] != self.iterations
+
+    def stats(self) -> dict:
+        """Queue-time percentiles (seconds) and counters."""
+        with self._lock:
+            samples = sorted(self._queue_times)
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))] if samples else 0.0
+        return {
+            "iterations": self.iterations,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_time_p50": percentile(50),
+            "queue_time_p95": percentile(95),
+            "queue_time_max": samples[-1] if samples else 0.0
+        }
@@ -0,0 +1,100 @@
+"""
+Session Cache for QuraAI
+In-process cache of verify_session results so hot sessions skip Cosmos DB
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+class SessionCache:
+    """Bounded TTL cache of verified (and rejected) sessions, keyed by session document id."""
+
+    def __init__(self, maxsize=10000, ttl_seconds=60, negative_ttl_seconds=5):
+        """
+        Initialize empty cache.
+
+        Args:
+            maxsize: Maximum cached sessions; least recently used are evicted
+            ttl_seconds: Lifetime of a valid entry (also capped by the session's expires_at)
+            negative_ttl_seconds: Lifetime of an rejected-session entry
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_key: str):
+        """Return the cached verify_session result, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            result, user_id, expires = entry
+            if now >= expires:
+                self._remove(session_key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_key)
+            self.hits += 1
+            return dict(result)
+
+    def set_valid(self, session_key: str, result: dict, expires_at: datetime):
+        """Cache a successful verification until the TTL or the session's expiry, whichever is first."""
+        lifetime = min(self.ttl_seconds, (expires_at - datetime.now()).total_seconds())
+        if lifetime > 0:
+            self._set(session_key, result, result.get("user_id"), lifetime)
+
+    def set_invalid(self, session_key: str, result: dict):
+        """Briefly cache a rejected session so repeated bad tokens skip the database."""
+        if self.negative_ttl_seconds > 0:
+            self._set(session_key, result, None, self.negative_ttl_seconds)
+
+    def _set(self, session_key, result, user_id, lifetime):
+        with self._lock:
+            if session_key in self._entries:
+                self._remove(session_key)
+            self._entries[session_key] = (dict(result), user_id, time.monotonic() + lifetime)
+            if user_id is not None:
+                self._keys_by_user.setdefault(user_id, set()).add(session_key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, session_key):
+        # Caller holds the lock
+        _, user_id, _ = self._entries.pop(session_key)
+        if user_id is not None:
+            keys = self._keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(session_key)
+                if not keys:
+                    del self._keys_by_user[user_id]
+
+    def invalidate(self, session_key: str):
+        """Drop one session (e.g. on logout or eviction)."""
+        with self._lock:
+            if session_key in self._entries:
+                self._remove(session_key)
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached session of a user (e.g. on deactivation)."""
+        with self._lock:
+            for session_key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(session_key)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries)
+        }
@@ -0,0 +1,364 @@
+"""
+Data Access Layer for QuraAI
+Async Cosmos DB access for api.py. One client, and so one connection pool,
+is shared by every request in the process; calls never block the event loop.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+import aiohttp
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.cosmos.aio import CosmosClient
+from azure.cosmos.exceptions import CosmosResourceNotFoundError, CosmosResourceExistsError
+from dotenv import load_dotenv
+from lru import LRUCache
+from write_behind import WriteBehindQueue
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = "QureAiDB"
+
+HEALTH_PROFILES = "health_profiles"
+MEDICINES = "medicines"
+MEDICAL_CONDITIONS = "medical_conditions"
+RISK_ASSESSMENTS = "risk_assessments"
+CHAT_SESSIONS = "chat_sessions"
+
+# Upper bound on concurrent connections to Cosmos DB from this process
+COSMOS_MAX_CONNECTIONS = int(os.getenv("COSMOS_MAX_CONNECTIONS", "100"))
+
+# Per-user cache of medicines, conditions and profile. Writes through this
+# module invalidate it; the TTL bounds staleness from writes in other processes
+USER_DATA_CACHE_SIZE = int(os.getenv("USER_DATA_CACHE_SIZE", "10000"))
+USER_DATA_CACHE_TTL_SECONDS = float(os.getenv("USER_DATA_CACHE_TTL_SECONDS", "300"))
+
+# Background batching of fire-and-forget writes (chat turns, risk assessments)
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = min(100, int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50")))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "500"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+
+# Status codes worth retrying: timeout, throttling, write conflict retry, server errors
+TRANSIENT_STATUS_CODES = {408, 429, 449, 500, 502, 503, 504}
+
+_client = None
+_database = None
+_lock = threading.Lock()
+
+def _get_database():
+    """Return the shared database proxy, creating the async client on first use."""
+    global _client, _database
+    if _database is None:
+        with _lock:
+            if _database is None:
+                session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=COSMOS_MAX_CONNECTIONS))
+                _client = CosmosClient(
+                    os.getenv("COSMOS_DB_ENDPOINT"),
+                    os.getenv("COSMOS_DB_KEY"),
+                    transport=AioHttpTransport(session=session, session_owner=True)
+                )
+                _database = _client.get_database_client(DATABASE_NAME)
+    return _database
+
+def container(name: str):
+    return _get_database().get_container_client(name)
+
+class UserDataCache:
+    """Bounded TTL cache of per-user documents, keyed by (user_id, kind)."""
+    
+    def __init__(self, maxsize=USER_DATA_CACHE_SIZE, ttl_seconds=USER_DATA_CACHE_TTL_SECONDS):
+        self.entries = LRUCache(maxsize)
+        self.ttl_seconds = ttl_seconds
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def generation(self, user_id, kind):
+        """Counter bumped by every invalidation; a load started under an older generation is not stored."""
+        return self._generations.get((user_id, kind), 0)
+    
+    async def get_or_load(self, user_id, kind, load):
+        """Return the cached value or await load() and cache its result."""
+        entry = self.entries.get((user_id, kind))
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        
+        generation = self.generation(user_id, kind)
+        value = await load()
+        if self.ttl_seconds > 0 and self.generation(user_id, kind) == generation:
+            # Wrapped so a cached None (e.g. no profile) is still a hit
+            self.entries.set((user_id, kind), (value,), time.time() + self.ttl_seconds)
+        return value
+    
+    def put(self, user_id, kind, value):
+        """Write-through update after a successful write."""
+        self.invalidate(user_id, kind)
+        if self.ttl_seconds > 0:
+            self.entries.set((user_id, kind), (value,), time.time() + self.ttl_seconds)
+    
+    def invalidate(self, user_id, kind):
+        self._generations[(user_id, kind)] = self.generation(user_id, kind) + 1
+        self.entries.delete((user_id, kind))
+    
+    def stats(self):
+        """Return hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries)
+        }
+
+user_cache = UserDataCache()
+
+# Loads already started in the current request, keyed like the user cache
+_request_memo = contextvars.ContextVar("request_memo", default=None)
+
+@contextmanager
+def request_scope():
+    """Deduplicate data loads for the duration of one request."""
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+async def _memoized(key, load):
+    memo = _request_memo.get()
+    if memo is None:
+        return await load()
+    # Store the task, not the result, so concurrent loads share one round trip
+    task = memo.get(key)
+    if task is None:
+        task = memo[key] = asyncio.ensure_future(load())
+    return await task
+
+def _invalidate(user_id, kind):
+    user_cache.invalidate(user_id, kind)
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.pop((user_id, kind), None)
+
+async def close():
+    """Close the shared client and its connection pool (call at shutdown)."""
+    global _client, _database
+    if _client is not None:
+        await _client.close()
+        _client = None
+        _database = None
+
+async def query_by_user(name: str, user_id: str, fields: str = "*") -> list:
+    """
+    Documents of a user in one container (single-partition query on /userId).
+    
+    Args:
+        name: Container name
+        user_id: User id (partition key)
+        fields: SELECT list, e.g. "c.name" to project only what is needed
+    """
+    items = container(name).query_items(
+        query=f"SELECT {fields} FROM c WHERE c.userId = @userId",
+        parameters=[{"name": "@userId", "value": user_id}],
+        partition_key=user_id
+    )
+    return [item async for item in items]
+
+async def read(name: str, item_id: str, partition_key: str):
+    """Point read; None if the document does not exist."""
+    try:
+        return await container(name).read_item(item_id, partition_key)
+    except CosmosResourceNotFoundError:
+        return None
+
+async def create(name: str, body: dict) -> dict:
+    return await container(name).create_item(body)
+
+async def replace(name: str, item_id: str, body: dict) -> dict:
+    return await container(name).replace_item(item_id, body)
+
+async def upsert(name: str, body: dict) -> dict:
+    return await container(name).upsert_item(body)
+
+async def delete(name: str, item_id: str, partition_key: str):
+    await container(name).delete_item(item_id, partition_key)
+
+async def upsert_batch(name: str, partition_key: str, documents: list):
+    """Upsert documents sharing a partition key in one transactional batch (at most 100)."""
+    await container(name).execute_item_batch(
+        [("upsert", (document,)) for document in documents],
+        partition_key=partition_key
+    )
+
+def is_transient_error(error: Exception) -> bool:
+    """True for write failures a retry can fix; False for e.g. 400, 409 or 413."""
+    if isinstance(error, (asyncio.TimeoutError, ServiceRequestError, ServiceResponseError)):
+        return True
+    return getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES
+
+write_queue = WriteBehindQueue(
+    upsert_batch,
+    upsert,
+    is_retryable=is_transient_error,
+    max_queue=WRITE_BEHIND_MAX_QUEUE,
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=WRITE_BEHIND_FLUSH_MS / 1000.0,
+    max_retries=WRITE_BEHIND_MAX_RETRIES
+)
+
+async def check_partition_keys():
+    """
+    Match write-behind batching to the actual partition keys (call at startup).
+    
+    Batches group documents by the field the container is partitioned on, so
+    a container not on /userId is batched by its own key field, or written one
+    document at a time if its key is nested, hierarchical or cannot be read.
+    """
+    for name in (CHAT_SESSIONS, RISK_ASSESSMENTS):
+        try:
+            properties = await container(name).read()
+            paths = properties["partitionKey"]["paths"]
+        except Exception as e:
+            logger.warning("Could not read the partition key of %s, writing it unbatched: %s", name, e)
+            write_queue.set_partition_key(name, None)
+            continue
+        
+        field = paths[0][1:] if len(paths) == 1 else ""
+        if not field or "/" in field:
+            logger.warning("Partition key %s of %s is not a top-level field, writing it unbatched", paths, name)
+            field = None
+        elif field != "userId":
+            logger.warning("%s is partitioned on %s, not /userId", name, paths[0])
+        write_queue.set_partition_key(name, field)
+
+@dataclass(frozen=True)
+class HealthContext:
+    """Names of a user's medicines and conditions, as used by the explanation logic."""
+    medicine_names: tuple = ()
+    condition_names: tuple = ()
+    
+    def __bool__(self):
+        return bool(self.medicine_names or self.condition_names)
+
+async def load_health_context(user_id: str) -> HealthContext:
+    """Medicine and condition names, served from the user cache or fetched concurrently."""
+    # Full documents rather than a name projection, so the same cache entries
+    # also serve /medicines, /conditions and /dashboard
+    medicines, conditions = await asyncio.gather(list_medicines(user_id), list_conditions(user_id))
+    return HealthContext(
+        medicine_names=tuple(m.get("name", "") for m in medicines),
+        condition_names=tuple(c.get("name", "") for c in conditions)
+    )
+
+# Health profiles
+async def get_profile(user_id: str):
+    return await _memoized((user_id, HEALTH_PROFILES), lambda: user_cache.get_or_load(
+        user_id, HEALTH_PROFILES, lambda: read(HEALTH_PROFILES, user_id, user_id)))
+
+async def save_profile(profile_data: dict) -> bool:
+    """Create or replace a profile; True if it was newly created."""
+    user_id = profile_data["userId"]
+    _invalidate(user_id, HEALTH_PROFILES)
+    try:
+        saved = await create(HEALTH_PROFILES, profile_data)
+        created = True
+    except CosmosResourceExistsError:
+        saved = await replace(HEALTH_PROFILES, profile_data["id"], profile_data)
+        created = False
+    user_cache.put(user_id, HEALTH_PROFILES, saved)
+    return created
+
+# Medicines
+async def list_medicines(user_id: str) -> list:
+    return await _memoized((user_id, MEDICINES), lambda: user_cache.get_or_load(
+        user_id, MEDICINES, lambda: query_by_user(MEDICINES, user_id)))
+
+async def add_medicine(medicine_data: dict) -> dict:
+    try:
+        return await create(MEDICINES, medicine_data)
+    finally:
+        _invalidate(medicine_data["userId"], MEDICINES)
+
+async def delete_medicine(medicine_id: str, user_id: str):
+    try:
+        await delete(MEDICINES, medicine_id, user_id)
+    finally:
+        _invalidate(user_id, MEDICINES)
+
+# Medical conditions
+async def list_conditions(user_id: str) -> list:
+    return await _memoized((user_id, MEDICAL_CONDITIONS), lambda: user_cache.get_or_load(
+        user_id, MEDICAL_CONDITIONS, lambda: query_by_user(MEDICAL_CONDITIONS, user_id)))
+
+async def add_condition(condition_data: dict) -> dict:
+    try:
+        return await create(MEDICAL_CONDITIONS, condition_data)
+    finally:
+        _invalidate(condition_data["userId"], MEDICAL_CONDITIONS)
+
+# Risk assessments
+def regimen_hash(medicines: list) -> str:
+    """Content hash of the fields of a regimen that a risk assessment depends on."""
+    regimen = sorted(
+        [m.get("name"), m.get("dosage"), m.get("frequency"), m.get("times"), m.get("status")]
+        for m in medicines
+    )
+    return hashlib.sha256(json.dumps(regimen, sort_keys=True, default=str).encode()).hexdigest()
+
+def risk_assessment_id(user_id: str, content_hash: str) -> str:
+    return f"{user_id}-{content_hash[:16]}"
+
+class RiskAssessmentStore:
+    """Persists a risk assessment only when the regimen it was computed from changes."""
+    
+    def __init__(self, maxsize=USER_DATA_CACHE_SIZE):
+        self.last_hashes = LRUCache(maxsize)
+        self.queued = 0
+        self.skipped = 0
+    
+    def record(self, risk_data: dict, content_hash: str):
+        """Queue a write-behind upsert unless this regimen was already stored."""
+        user_id = risk_data["userId"]
+        if self.last_hashes.get(user_id) == content_hash:
+            self.skipped += 1
+            return
+        self.last_hashes.set(user_id, content_hash)
+        # Deterministic id: re-storing the same regimen overwrites, never duplicates
+        write_queue.enqueue(RISK_ASSESSMENTS, risk_data, on_drop=lambda: self._forget(user_id, content_hash))
+        self.queued += 1
+    
+    def _forget(self, user_id, content_hash):
+        # Dropped write: let the next request try again
+        if self.last_hashes.get(user_id) == content_hash:
+            self.last_hashes.delete(user_id)
+    
+    def stats(self):
+        return {"queued": self.queued, "skipped": self.skipped}
+
+risk_store = RiskAssessmentStore()
+
+# Chat sessions
+def add_chat_message(chat_data: dict) -> bool:
+    """Queue a chat turn for background persistence; False if it had to be dropped."""
+    return write_queue.enqueue(CHAT_SESSIONS, chat_data)
+
+def metrics() -> dict:
+    """Counters for the user cache, risk-assessment store and write-behind queue."""
+    return {
+        "user_cache": user_cache.stats(),
+        "risk_assessments": risk_store.stats(),
+        "write_behind": write_queue.stats()
+    }
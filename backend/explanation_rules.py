@@ -0,0 +1,119 @@
+"""
+Explanation Rules for QuraAI
+
+Rule tables behind generate_contextual_explanation. Each table is compiled
+once into a single regex that finds every keyword in one pass over the
+message, so adding symptoms or drugs does not add scans per request.
+Matching keeps the original semantics: keywords match as substrings of the
+lowercased text, and the first rule in table order wins.
+"""
+
+import re
+
+# General assistant: (label, keywords, explanation), highest priority first
+GENERAL_RULES = [
+    ("headache", ("headache", "head pain"),
+     "Headaches can happen for many reasons such as stress, dehydration, lack of sleep, or tension."),
+    ("stomach", ("stomach", "nausea", "sick"),
+     "Stomach discomfort may result from dietary changes, stress, or minor digestive issues."),
+    ("fatigue", ("tired", "fatigue", "exhausted"),
+     "Fatigue often occurs due to insufficient sleep, stress, or changes in routine."),
+    ("chest", ("chest", "heart", "breathing"),
+     "Chest sensations can be related to anxiety, physical exertion, or muscle tension."),
+    ("dizziness", ("dizzy", "lightheaded"),
+     "Dizziness can be caused by dehydration, standing up quickly, or low blood sugar."),
+]
+GENERAL_DEFAULT = "Your symptoms may be related to common factors like stress, lifestyle changes, or minor health variations."
+
+# Contextual assistant: (label, keywords, {drug or None: explanation}); drugs are checked in order
+CONTEXT_RULES = [
+    ("dizziness", ("dizzy", "lightheaded"), {
+        "metformin": "dizziness can sometimes occur, especially if blood sugar drops.",
+        "lisinopril": "dizziness may occur when standing up quickly due to blood pressure changes.",
+        None: "dizziness could be related to your current medications or condition."
+    }),
+    ("stomach", ("stomach", "nausea"), {
+        "metformin": "stomach upset is a known side effect, especially when starting treatment.",
+        None: "stomach discomfort could be related to your medications or dietary changes."
+    }),
+    ("fatigue", ("tired", "fatigue"), {
+        None: "fatigue can sometimes be related to your current treatment or condition management."
+    }),
+    ("headache", ("headache",), {
+        None: "headaches may be related to your current medications or condition."
+    }),
+]
+CONTEXT_DEFAULT = "your symptoms could be related to your current treatment plan."
+
+class KeywordMatcher:
+    """Single-pass multi-keyword matcher over a prioritized rule list."""
+
+    def __init__(self, rules):
+        """
+        Compile rules into one pattern.
+
+        Args:
+            rules: List of (label, keywords); earlier labels take priority
+        """
+        self.labels = [label for label, _ in rules]
+        priority = {}
+        for index, (_, keywords) in enumerate(rules):
+            for keyword in keywords:
+                priority.setdefault(keyword.lower(), index)
+
+        # A match reports only the longest keyword at each position, so each
+        # keyword also carries the rules of any keywords that are its prefixes
+        self.implied = {
+            keyword: {index for other, index in priority.items() if keyword.startswith(other)}
+            for keyword in priority
+        }
+        alternation = "|".join(re.escape(k) for k in sorted(priority, key=len, reverse=True))
+        # Zero-width lookahead so overlapping keywords are all found
+        self.pattern = re.compile(f"(?=({alternation}))") if priority else None
+
+    def match_indices(self, text):
+        """Indices of all rules with a keyword occurring in text (lowercased)."""
+        if self.pattern is None:
+            return set()
+        found = set()
+        for keyword in set(self.pattern.findall(text)):
+            found |= self.implied[keyword]
+        return found
+
+    def matches(self, text):
+        """Labels of all matching rules, in priority order."""
+        return [self.labels[i] for i in sorted(self.match_indices(text))]
+
+    def first(self, text):
+        """Highest-priority matching label, or None."""
+        found = self.match_indices(text)
+        return self.labels[min(found)] if found else None
+
+GENERAL_MATCHER = KeywordMatcher([(label, keywords) for label, keywords, _ in GENERAL_RULES])
+CONTEXT_MATCHER = KeywordMatcher([(label, keywords) for label, keywords, _ in CONTEXT_RULES])
+DRUG_MATCHER = KeywordMatcher([
+    (drug, (drug,))
+    for drug in dict.fromkeys(d for _, _, texts in CONTEXT_RULES for d in texts if d is not None)
+])
+
+_GENERAL_TEXT = {label: text for label, _, text in GENERAL_RULES}
+_CONTEXT_TEXT = {label: texts for label, _, texts in CONTEXT_RULES}
+
+def general_explanation(message_lower):
+    """Base explanation for a user without health context."""
+    label = GENERAL_MATCHER.first(message_lower)
+    return _GENERAL_TEXT[label] if label else GENERAL_DEFAULT
+
+def contextual_explanation(message_lower, medicine_names):
+    """Explanation (without the context intro) for a user's message and medicines."""
+    label = CONTEXT_MATCHER.first(message_lower)
+    if label is None:
+        return CONTEXT_DEFAULT
+
+    texts = _CONTEXT_TEXT[label]
+    # Newline-joined so a drug keyword cannot match across two names
+    drugs = set(DRUG_MATCHER.matches("\n".join(medicine_names).lower()))
+    for drug, text in texts.items():
+        if drug is not None and drug in drugs:
+            return text
+    return texts[None]
@@ -0,0 +1,51 @@
+"""
+LRU Cache for QuraAI
+Bounded in-memory cache shared by the AI layer and the data access layer
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe in-memory LRU with per-entry expiry."""
+
+    def __init__(self, maxsize=1024):
+        """Initialize empty cache holding at most maxsize entries."""
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return cached value or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        """Store value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
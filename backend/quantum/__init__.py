@@ -1,3 +1,10 @@
-from .run_quantum import run_quantum_engine, validate_input
+__all__ = ['run_quantum_engine', 'validate_input']
 
-__all__ = ['run_quantum_engine', 'validate_input']
\ No newline at end of file
+
+def __getattr__(name):
+    # Resolved on first use so the API process can import the worker pool and
+    # result protocol without loading the solver stack (qiskit lives in qenv)
+    if name in __all__:
+        from . import run_quantum
+        return getattr(run_quantum, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
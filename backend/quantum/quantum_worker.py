@@ -0,0 +1,62 @@
+"""
+Warm Quantum Worker Process
+
+Long-lived worker started by QuantumWorkerPool with the qenv interpreter.
+Imports the solver stack once, then answers newline-delimited JSON jobs
+read from stdin:
+
+    request:  {"id": "<request id>", "input": {...}, "use_quantum": true}
+    response: {"id": "<request id>", "ok": true, "result": <QuantumResult message>}
+"""
+import json
+import os
+import sys
+
+# Make the backend package importable when launched as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from quantum.run_quantum import run_quantum_engine
+from quantum.result_protocol import QuantumResult
+
+
+def serve(protocol_in, protocol_out):
+    """
+    Answer jobs until stdin is closed
+
+    Args:
+        protocol_in: Text stream carrying one JSON request per line
+        protocol_out: Text stream receiving one JSON response per line
+    """
+    # Announce readiness so the pool knows imports have finished
+    protocol_out.write(json.dumps({"id": None, "ok": True, "ready": True}) + "\n")
+    protocol_out.flush()
+
+    for line in protocol_in:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            job = json.loads(line)
+            request_id = job.get("id")
+            input_data = job["input"]
+            input_data["interactions"] = {
+                (drug1, drug2): weight for drug1, drug2, weight in input_data.get("interactions", [])
+            }
+            result = run_quantum_engine(input_data, use_quantum=job.get("use_quantum", True))
+            message = QuantumResult.from_engine(result, input_data["drugs"]).encode()
+            response = {"id": request_id, "ok": True, "result": message}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+
+        protocol_out.write(json.dumps(response, separators=(",", ":")) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    # Keep the protocol stream clean: anything printed by solver libraries
+    # goes to stderr instead of corrupting the response channel
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    serve(sys.stdin, protocol_out)
@@ -0,0 +1,67 @@
+"""
+Quantum Result Protocol
+
+Compact typed result message exchanged between the quantum engine and the
+API process, replacing print output that callers had to scrape.
+
+Wire format (JSON, short keys):
+    {"v": 1, "x": [1, 0], "e": -0.13, "s": "SUCCESS", "t": {"build_ms": 0.1, "solve_ms": 812.4}}
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
+
+PROTOCOL_VERSION = 1
+
+
+@dataclass
+class QuantumResult:
+    """Solution vector (in the problem's drug order), energy, status and timings."""
+    solution: List[int]
+    energy: float
+    status: str
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_engine(cls, result: Dict[str, Any], drug_names: List[str]) -> "QuantumResult":
+        """Build from a run_quantum_engine result dictionary."""
+        solution = result.get("solution", {})
+        return cls(
+            solution=[int(solution.get(drug, 0)) for drug in drug_names],
+            energy=float(result.get("energy", 0.0)),
+            status=result.get("status", "ERROR"),
+            timings=result.get("timings", {})
+        )
+
+    def solution_dict(self, drug_names: List[str]) -> Dict[str, int]:
+        """Map the solution vector back to drug names."""
+        return dict(zip(drug_names, self.solution))
+
+    def encode(self) -> Dict[str, Any]:
+        """Encode to the compact wire message."""
+        return {
+            "v": PROTOCOL_VERSION,
+            "x": self.solution,
+            "e": self.energy,
+            "s": self.status,
+            "t": {name: round(value, 3) for name, value in self.timings.items()}
+        }
+
+    @classmethod
+    def decode(cls, message: Dict[str, Any]) -> "QuantumResult":
+        """
+        Decode a compact wire message
+
+        Raises:
+            ValueError: Message has an unknown version or is malformed
+        """
+        if message.get("v") != PROTOCOL_VERSION:
+            raise ValueError(f"Unsupported quantum result version: {message.get('v')}")
+        try:
+            return cls(
+                solution=[int(bit) for bit in message["x"]],
+                energy=float(message["e"]),
+                status=str(message["s"]),
+                timings={name: float(value) for name, value in message.get("t", {}).items()}
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed quantum result: {e}")
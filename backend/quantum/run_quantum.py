@@ -1,10 +1,12 @@
 """
 Quantum Engine Entry Point
 """
+import time
 from typing import Dict, Any
 from .qubo_model import QUBOModel
 from .classical_solver import ClassicalSolver
 from .quantum_solver import QuantumSolver
+from .analytic_solver import solve_trivial
 
 def run_quantum_engine(input_data: Dict[str, Any], use_quantum: bool = True) -> Dict[str, Any]:
     """
@@ -15,13 +17,20 @@ def run_quantum_engine(input_data: Dict[str, Any], use_quantum: bool = True) ->
         use_quantum: Whether to use quantum solver (True) or classical (False)
         
     Returns:
-        Dictionary with solution, energy, and status
+        Dictionary with solution, energy, status, and timings (ms)
     """
     try:
+        # 0-1 drug problems have a closed-form answer
+        trivial = solve_trivial(input_data)
+        if trivial is not None:
+            return trivial
+        
         # Build QUBO model
+        build_start = time.perf_counter()
         qubo_builder = QUBOModel()
         Q = qubo_builder.build_qubo(input_data)
         drug_names = input_data["drugs"]
+        build_ms = (time.perf_counter() - build_start) * 1000
         
         # Choose solver
         if use_quantum and len(drug_names) <= 10:  # Quantum for small problems
@@ -30,7 +39,12 @@ def run_quantum_engine(input_data: Dict[str, Any], use_quantum: bool = True) ->
             solver = ClassicalSolver()
         
         # Solve
+        solve_start = time.perf_counter()
         result = solver.solve(Q, drug_names)
+        result["timings"] = {
+            "build_ms": build_ms,
+            "solve_ms": (time.perf_counter() - solve_start) * 1000
+        }
         
         return result
         
@@ -0,0 +1,266 @@
+"""
+Quantum Worker Pool
+
+Keeps a small set of warm quantum worker processes (see quantum_worker.py)
+so API requests dispatch problems over a local pipe instead of starting a
+fresh interpreter and re-importing qiskit for every request.
+"""
+import json
+import logging
+import os
+import queue
+import select
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+from .result_protocol import QuantumResult
+
+logger = logging.getLogger(__name__)
+
+
+class _Worker:
+    """One warm worker process speaking newline-delimited JSON over pipes."""
+
+    def __init__(self, python_bin: str, worker_script: str):
+        self.proc = subprocess.Popen(
+            [python_bin, worker_script],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0
+        )
+        self.jobs_done = 0
+        self._buffer = b""
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def send(self, message: Dict[str, Any]):
+        self.proc.stdin.write((json.dumps(message) + "\n").encode())
+        self.proc.stdin.flush()
+
+    def read_message(self, timeout: float) -> Dict[str, Any]:
+        """
+        Read the next protocol message
+
+        Raises:
+            TimeoutError: No complete message arrived within timeout
+            RuntimeError: Worker exited
+        """
+        deadline = time.monotonic() + timeout
+        fd = self.proc.stdout.fileno()
+
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Quantum worker did not respond in time")
+
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("Quantum worker exited unexpectedly")
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def stop(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.proc.kill()
+
+
+class QuantumWorkerPool:
+    """Pool of warm quantum workers with per-job timeouts and recycling."""
+
+    def __init__(
+        self,
+        python_bin: str,
+        worker_script: str,
+        size: int = 2,
+        max_jobs_per_worker: int = 200,
+        job_timeout: float = 30.0,
+        startup_timeout: float = 120.0,
+        spawn_backoff: float = 1.0,
+        max_spawn_backoff: float = 60.0
+    ):
+        """
+        Args:
+            python_bin: Interpreter with the quantum dependencies (qenv)
+            worker_script: Path to quantum_worker.py
+            size: Number of warm workers to keep
+            max_jobs_per_worker: Jobs served before a worker is recycled
+            job_timeout: Default seconds to wait for a job result
+            startup_timeout: Seconds a new worker may take to import its solvers
+            spawn_backoff: Seconds before retrying a worker that failed to start (doubles per failure)
+            max_spawn_backoff: Cap on the retry delay
+        """
+        self.python_bin = python_bin
+        self.worker_script = worker_script
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.spawn_backoff = spawn_backoff
+        self.max_spawn_backoff = max_spawn_backoff
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._starting = 0
+        self._started = False
+        self._closed = threading.Event()
+
+    def start(self):
+        """Spawn all workers in the background; they join the pool once warm. Idempotent."""
+        with self._lock:
+            if self._started or self._closed.is_set():
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._spawn_async()
+
+    def _spawn_async(self, replacing: bool = False):
+        with self._lock:
+            if replacing:
+                self._live -= 1
+            # Counted before the thread runs so solve() never sees a gap
+            self._starting += 1
+        threading.Thread(target=self._spawn, daemon=True).start()
+
+    def _spawn(self):
+        """Start one worker, retrying with exponential backoff until it is warm or the pool closes."""
+        attempt = 0
+        while not self._closed.is_set():
+            worker = None
+            try:
+                worker = _Worker(self.python_bin, self.worker_script)
+                message = worker.read_message(self.startup_timeout)
+                if not message.get("ready"):
+                    raise RuntimeError("Unexpected worker handshake")
+            except Exception as e:
+                if worker is not None:
+                    worker.proc.kill()
+                delay = min(self.max_spawn_backoff, self.spawn_backoff * (2 ** attempt))
+                attempt += 1
+                logger.warning("Quantum worker failed to start (attempt %d), retrying in %.1fs: %s",
+                               attempt, delay, e)
+                # Not "starting" while backing off, so requests fail fast meanwhile
+                with self._lock:
+                    self._starting -= 1
+                self._closed.wait(delay)
+                with self._lock:
+                    self._starting += 1
+                continue
+
+            with self._lock:
+                self._starting -= 1
+                if not self._closed.is_set():
+                    self._live += 1
+                    self._idle.put(worker)
+                    return
+            worker.stop()
+            return
+
+        with self._lock:
+            self._starting -= 1
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        """Drop a worker and start its replacement."""
+        if kill:
+            worker.proc.kill()
+        else:
+            worker.stop()
+        self._spawn_async(replacing=True)
+
+    def _acquire(self, deadline: float) -> _Worker:
+        """Wait for an idle worker, failing fast if none is running or starting."""
+        while True:
+            if self._closed.is_set():
+                raise RuntimeError("Quantum worker pool is shut down")
+            with self._lock:
+                starved = self._live == 0 and self._starting == 0
+            if starved:
+                raise RuntimeError("No quantum workers running")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("No quantum worker available")
+            try:
+                # Short waits so a worker that dies while starting is noticed
+                return self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+    def solve(self, input_data: Dict[str, Any], use_quantum: bool = True,
+              timeout: Optional[float] = None) -> QuantumResult:
+        """
+        Run one problem on a warm worker
+
+        Args:
+            input_data: Structured input for run_quantum_engine
+            use_quantum: Whether the worker should use the QAOA solver
+            timeout: Seconds to wait for a worker and its result
+
+        Returns:
+            Decoded QuantumResult (solution in input_data["drugs"] order)
+
+        Raises:
+            TimeoutError: No worker became available or the job overran
+            RuntimeError: No worker is running or starting, or the worker failed or reported an error
+            ValueError: The worker sent a malformed result message
+        """
+        self.start()
+        timeout = timeout if timeout is not None else self.job_timeout
+        deadline = time.monotonic() + timeout
+        worker = self._acquire(deadline)
+
+        if not worker.alive():
+            self._retire(worker, kill=True)
+            raise RuntimeError("Quantum worker exited unexpectedly")
+
+        # JSON has no tuple keys: send pair interactions as [drug1, drug2, weight]
+        payload = dict(input_data)
+        payload["interactions"] = [
+            [drug1, drug2, weight] for (drug1, drug2), weight in input_data["interactions"].items()
+        ]
+
+        request_id = uuid.uuid4().hex
+        try:
+            worker.send({"id": request_id, "input": payload, "use_quantum": use_quantum})
+
+            # Skip any stale reply left over from an earlier job
+            while True:
+                message = worker.read_message(max(0.0, deadline - time.monotonic()))
+                if message.get("id") == request_id:
+                    break
+        except Exception:
+            # Timed out or broken: the worker state is unknown, replace it
+            self._retire(worker, kill=True)
+            raise
+
+        worker.jobs_done += 1
+        if self._closed.is_set() or worker.jobs_done >= self.max_jobs_per_worker:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+        if not message.get("ok"):
+            raise RuntimeError(message.get("error", "Quantum worker error"))
+        return QuantumResult.decode(message["result"])
+
+    def shutdown(self):
+        """Stop all idle workers; busy ones are stopped when they are returned."""
+        self._closed.set()
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
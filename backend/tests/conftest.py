@@ -0,0 +1,12 @@
+"""
+Test configuration: make backend modules importable the way the services
+import them (package imports from backend/, flat imports from ai/ and auth/).
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, 'ai'), os.path.join(BACKEND_DIR, 'auth')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,95 @@
+"""
+In-memory stand-ins for the azure-cosmos sync container and database
+proxies, covering the calls AuthManager makes (including etag conditions).
+"""
+import copy
+import re
+import threading
+import time
+import uuid
+
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError, CosmosResourceExistsError, CosmosResourceNotFoundError
+)
+
+
+class FakeContainer:
+    """Documents keyed by id, with server-assigned _etag and _ts."""
+
+    def __init__(self, name, partition_key_path="/id"):
+        self.name = name
+        self.partition_key_path = partition_key_path
+        self.items = {}
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def read(self):
+        return {"id": self.name, "defaultTtl": -1, "partitionKey": {"paths": [self.partition_key_path], "kind": "Hash"}}
+
+    def _store(self, body):
+        doc = copy.deepcopy(dict(body))
+        doc["_etag"] = uuid.uuid4().hex
+        doc["_ts"] = int(time.time())
+        self.items[doc["id"]] = doc
+        return copy.deepcopy(doc)
+
+    def _check(self, item_id, etag, match_condition):
+        if item_id not in self.items:
+            raise CosmosResourceNotFoundError(status_code=404, message="Not found")
+        if match_condition == MatchConditions.IfNotModified and self.items[item_id]["_etag"] != etag:
+            raise CosmosAccessConditionFailedError(status_code=412, message="Precondition failed")
+
+    def create_item(self, body, **kwargs):
+        with self._lock:
+            if body["id"] in self.items:
+                raise CosmosResourceExistsError(status_code=409, message="Conflict")
+            return self._store(body)
+
+    def read_item(self, item, partition_key, **kwargs):
+        with self._lock:
+            if item not in self.items:
+                raise CosmosResourceNotFoundError(status_code=404, message="Not found")
+            return copy.deepcopy(self.items[item])
+
+    def replace_item(self, item, body, etag=None, match_condition=None, **kwargs):
+        with self._lock:
+            self._check(item, etag, match_condition)
+            return self._store(body)
+
+    def upsert_item(self, body, **kwargs):
+        with self._lock:
+            return self._store(body)
+
+    def delete_item(self, item, partition_key, etag=None, match_condition=None, **kwargs):
+        with self._lock:
+            self._check(item, etag, match_condition)
+            del self.items[item]
+
+    def query_items(self, query, parameters=None, **kwargs):
+        """Record the query; answers "c.<field> = @<name>" filters, and unfiltered queries with every document."""
+        self.queries.append(query)
+        with self._lock:
+            docs = [copy.deepcopy(doc) for doc in self.items.values()]
+        for parameter in parameters or []:
+            field = re.search(rf"c\.(\w+)\s*=\s*{parameter['name']}\b", query).group(1)
+            docs = [doc for doc in docs if doc.get(field) == parameter["value"]]
+        return docs
+
+
+class FakeDatabase:
+    """Database proxy handing out FakeContainers by name."""
+
+    def __init__(self):
+        self.containers = {}
+
+    def get_container_client(self, name):
+        return self.containers.setdefault(name, FakeContainer(name))
+
+    def create_container_if_not_exists(self, id, partition_key=None, **kwargs):
+        if id not in self.containers and partition_key is not None:
+            self.containers[id] = FakeContainer(id, partition_key["paths"][0])
+        return self.get_container_client(id)
+
+    def replace_container(self, container, **kwargs):
+        return container
@@ -0,0 +1,113 @@
+"""
+Tests for email-index signup and login (auth/auth_manager.py)
+"""
+import time
+
+import pytest
+
+import auth_manager
+from auth_manager import AuthManager, email_doc_id
+from cosmos_fakes import FakeDatabase
+from password_hasher import HasherBusyError, PasswordHasher
+
+EMAIL = "Patient@Example.com"
+
+
+@pytest.fixture
+def auth():
+    manager = AuthManager(database=FakeDatabase())
+    manager.password_hasher = PasswordHasher(iterations=1000, workers=2)
+    manager.backfill_email_index()
+    manager.users_container.queries.clear()
+    return manager
+
+
+def index_entry(auth):
+    return auth.email_index_container.items.get(email_doc_id(EMAIL))
+
+
+def test_signup_then_login_by_point_read(auth):
+    assert auth.signup(EMAIL, "secret-1", "Pat")["success"]
+    login = auth.login("  patient@example.COM ", "secret-1")
+    assert login["success"]
+    assert auth.users_container.queries == []
+
+
+def test_duplicate_signup_is_rejected(auth):
+    assert auth.signup(EMAIL, "secret-1", "Pat")["success"]
+    assert not auth.signup(EMAIL.lower(), "secret-2", "Pat")["success"]
+    assert len(auth.users_container.items) == 1
+
+
+def test_claim_of_signup_in_progress_is_not_taken_over(auth):
+    # First request has claimed the email but not created its user yet
+    auth.email_index_container.create_item(auth._index_entry("first-signup", EMAIL))
+
+    result = auth.signup(EMAIL, "secret-2", "Pat")
+
+    assert not result["success"]
+    assert index_entry(auth)["userId"] == "first-signup"
+    assert auth.users_container.items == {}
+
+
+def test_abandoned_claim_is_taken_over_after_grace_period(auth):
+    auth.email_index_container.create_item(auth._index_entry("crashed-signup", EMAIL))
+    index_entry(auth)["_ts"] -= auth_manager.EMAIL_CLAIM_GRACE_SECONDS + 1
+
+    result = auth.signup(EMAIL, "secret-1", "Pat")
+
+    assert result["success"]
+    assert index_entry(auth)["userId"] == result["user_id"]
+
+
+def test_concurrent_takeover_of_abandoned_claim_has_one_winner(auth):
+    auth.email_index_container.create_item(auth._index_entry("crashed-signup", EMAIL))
+    index_entry(auth)["_ts"] -= auth_manager.EMAIL_CLAIM_GRACE_SECONDS + 1
+    container = auth.email_index_container
+    replace_item = container.replace_item
+
+    def replace_after_rival(item, body, **kwargs):
+        # A rival takeover lands between our read and our replace
+        container.upsert_item(auth._index_entry("rival-signup", EMAIL))
+        return replace_item(item, body, **kwargs)
+
+    container.replace_item = replace_after_rival
+    assert not auth._claim_email(EMAIL, "our-signup")
+    assert index_entry(auth)["userId"] == "rival-signup"
+
+
+def test_password_is_hashed_before_the_email_is_claimed(auth):
+    def busy(password):
+        raise HasherBusyError("busy")
+
+    auth.password_hasher.hash = busy
+    assert not auth.signup(EMAIL, "secret-1", "Pat")["success"]
+    assert index_entry(auth) is None
+
+
+def test_legacy_query_is_used_until_the_backfill_completes():
+    manager = AuthManager(database=FakeDatabase())
+    manager.password_hasher = PasswordHasher(iterations=1000, workers=2)
+    # A user created before the email index existed
+    manager.users_container.create_item({
+        "id": "old-user", "userId": "old-user", "email": EMAIL.lower(),
+        "password_hash": manager.hash_password("secret-1"), "full_name": "Pat", "is_active": True
+    })
+
+    assert not manager.signup(EMAIL, "secret-2", "Pat")["success"]
+    assert manager.login(EMAIL, "secret-1")["success"]
+    assert manager.users_container.queries
+
+    assert manager.backfill_email_index() == 1
+    manager.users_container.queries.clear()
+    assert not manager.login("nobody@example.com", "secret-1")["success"]
+    assert manager.users_container.queries == []
+
+
+def test_backfill_completion_survives_a_restart():
+    database = FakeDatabase()
+    AuthManager(database=database).backfill_email_index()
+    manager = AuthManager(database=database)
+    manager.users_container.queries.clear()
+    assert not manager.login("nobody@example.com", "secret-1")["success"]
+    assert manager.users_container.queries == []
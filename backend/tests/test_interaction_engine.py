@@ -0,0 +1,28 @@
+"""
+Tests for the columnar batch mode of InteractionEngine (ai/interaction_engine.py)
+"""
+import numpy as np
+
+from interaction_engine import InteractionEngine
+
+
+def test_batch_matches_per_patient_encoding():
+    engine = InteractionEngine()
+    patients = [
+        [{"name": "Metformin", "dose": "500mg", "time": "morning"},
+         {"name": "Lisinopril", "dose": "10 mg", "time": "Night"}],
+        {"medicines": [{"name": "Aspirin", "dose": "81mg", "time": "evening"},
+                       {"name": "Metformin", "dose": "1000mg", "time": "with food"}]},
+        [],
+    ]
+
+    batch = engine.process_medicines_batch(patients)
+    timing = batch.timing
+
+    for i, patient in enumerate(patients):
+        medicines = patient.get("medicines", []) if isinstance(patient, dict) else patient
+        expected = engine.process_medicines({"medicines": medicines})
+        rows = batch.patient_rows(i)
+        assert [batch.drug_names[d] for d in batch.drug_ids[rows]] == [m["name"] for m in medicines]
+        np.testing.assert_allclose(batch.doses[rows], [expected["variables"][m["name"]] for m in medicines])
+        np.testing.assert_allclose(timing[rows], [expected["time_encoding"][m["name"]] for m in medicines])
@@ -0,0 +1,142 @@
+"""
+Tests for LLM call deadlines, retries and hedging (ai/llm_resilience.py)
+"""
+import os
+import sys
+import time
+import asyncio
+import subprocess
+
+import httpx
+import openai
+import pytest
+from openai import AsyncAzureOpenAI
+
+from llm_resilience import LatencyTracker, LLMUnavailableError, acall_with_deadline, is_retryable
+
+REQUEST = httpx.Request("POST", "https://example.openai.azure.com/openai/deployments/gpt/chat/completions")
+
+
+def status_error(cls, status):
+    return cls(f"HTTP {status}", response=httpx.Response(status, request=REQUEST), body=None)
+
+
+def run(errors, result="ok", max_retries=2):
+    """Call acall_with_deadline with a make_call failing with errors in turn, then returning result."""
+    calls = []
+
+    async def make_call(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    async def main():
+        return await acall_with_deadline(make_call, 5.0, LatencyTracker(), hedge=False, max_retries=max_retries)
+
+    try:
+        return asyncio.run(main()), len(calls)
+    except LLMUnavailableError as e:
+        return e, len(calls)
+
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.RateLimitError, 429),
+    status_error(openai.InternalServerError, 500),
+    status_error(openai.InternalServerError, 503),
+    openai.APITimeoutError(request=REQUEST),
+    openai.APIConnectionError(request=REQUEST),
+    asyncio.TimeoutError(),
+])
+def test_transient_errors_are_retried(error):
+    assert is_retryable(error)
+    result, calls = run([error])
+    assert result == "ok"
+    assert calls == 2
+
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.BadRequestError, 400),
+    status_error(openai.AuthenticationError, 401),
+    status_error(openai.PermissionDeniedError, 403),
+    status_error(openai.NotFoundError, 404),
+    ValueError("Expecting value: line 1 column 1 (char 0)"),
+])
+def test_permanent_errors_fail_without_retry(error):
+    assert not is_retryable(error)
+    result, calls = run([error])
+    assert isinstance(result, LLMUnavailableError)
+    assert calls == 1
+
+
+def test_retries_are_bounded():
+    error = status_error(openai.InternalServerError, 500)
+    result, calls = run([error] * 5, max_retries=2)
+    assert isinstance(result, LLMUnavailableError)
+    assert calls == 3
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    calls = []
+    cancelled = []
+
+    async def make_call(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "slow"
+        return "fast"
+
+    tracker = LatencyTracker(default_seconds=0.05)
+
+    async def main():
+        result = await acall_with_deadline(make_call, 2.0, tracker)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "fast"
+    assert len(calls) == 2
+    assert cancelled == [True]
+    # Only the winner's latency feeds the hedge delay
+    assert len(tracker.samples) == 1
+
+
+def test_hedging_cuts_the_tail_of_a_fake_deployment():
+    script = os.path.join(os.path.dirname(__file__), "..", "ai", "fake_openai_server.py")
+    server = subprocess.Popen(
+        [sys.executable, script, "--port", "0", "--latency", "fixed:20", "--tail", "0.3:3000", "--seed", "6"],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        endpoint = server.stdout.readline().split(" on ")[1].strip()
+        client = AsyncAzureOpenAI(api_key="fake", api_version="2024-02-01", azure_endpoint=endpoint, max_retries=0)
+        tracker = LatencyTracker(default_seconds=0.2)
+
+        async def request(timeout):
+            response = await client.chat.completions.create(
+                model="gpt", messages=[{"role": "user", "content": "hello"}], timeout=timeout
+            )
+            return response.choices[0].message.content
+
+        async def main():
+            latencies = []
+            for _ in range(10):
+                start = time.monotonic()
+                await acall_with_deadline(request, 5.0, tracker)
+                latencies.append(time.monotonic() - start)
+            await client.close()
+            return latencies
+
+        latencies = asyncio.run(main())
+    finally:
+        server.terminate()
+        server.wait()
+
+    # With this seed 4 of the 10 first requests hit the 3s tail and no
+    # duplicate does; each of those calls is answered by its duplicate
+    assert sum(0.15 < latency < 1.5 for latency in latencies) == 4
+    assert max(latencies) < 1.5
@@ -0,0 +1,118 @@
+"""
+Tests for parse micro-batching and per-item answer validation (ai/parse_batcher.py)
+"""
+import re
+import json
+import asyncio
+from types import SimpleNamespace
+
+from parse_batcher import ParseMicroBatcher
+
+SINGLE = {"diseases": [], "medicines": [], "symptom": "single"}
+TEXT_LINE = re.compile(r'^\s*(\d+)\. (".*")$')
+
+
+def answer_from_text(index, text):
+    """Well-behaved model: lists the medicines named in its own text."""
+    medicines = [{"name": name, "dose_mg": "500", "time": "morning"}
+                 for name in ("Metformin", "Warfarin") if name.lower() in text.lower()]
+    return {"index": index, "diseases": [], "medicines": medicines, "symptom": "headache"}
+
+
+class ScriptedCompletions:
+    """chat.completions stand-in answering each numbered text with answer(index, text)."""
+
+    def __init__(self, answer=answer_from_text):
+        self.answer = answer
+        self.prompts = []
+
+    async def create(self, messages, **kwargs):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        texts = [(int(m.group(1)), json.loads(m.group(2)))
+                 for m in map(TEXT_LINE.match, prompt.splitlines()) if m]
+        content = json.dumps([self.answer(index, text) for index, text in texts])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_batcher(completions, single_calls):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    async def single_parse(message, deadline_seconds):
+        single_calls.append(message)
+        return SINGLE
+
+    return ParseMicroBatcher(lambda: client, "gpt", single_parse, window_ms=20, timeout_seconds=5)
+
+
+def parse_all(batcher, messages):
+    async def run():
+        return await asyncio.gather(*(batcher.parse(message) for message in messages))
+    return asyncio.run(run())
+
+
+def test_concurrent_messages_share_one_prompt():
+    completions = ScriptedCompletions()
+    single_calls = []
+    batcher = make_batcher(completions, single_calls)
+
+    results = parse_all(batcher, ["I take Metformin 500mg", "I take Warfarin 500mg", "I have a headache"])
+
+    assert len(completions.prompts) == 1
+    assert single_calls == []
+    assert [[m["name"] for m in r["medicines"]] for r in results] == [["Metformin"], ["Warfarin"], []]
+    assert all("index" not in r for r in results)
+
+
+def test_lone_message_uses_the_single_parse():
+    completions = ScriptedCompletions()
+    single_calls = []
+    batcher = make_batcher(completions, single_calls)
+
+    assert asyncio.run(batcher.parse("I have a headache")) == SINGLE
+    assert single_calls == ["I have a headache"]
+    assert completions.prompts == []
+
+
+def test_answer_borrowing_from_a_neighbour_is_parsed_alone():
+    def leaky(index, text):
+        answer = answer_from_text(index, text)
+        if index == 2:
+            # Medicine from text 1 bleeds into the answer for text 2
+            answer["medicines"].append({"name": "Metformin", "dose_mg": "500", "time": "morning"})
+        return answer
+
+    single_calls = []
+    batcher = make_batcher(ScriptedCompletions(leaky), single_calls)
+
+    results = parse_all(batcher, ["I take Metformin 500mg", "I have a headache"])
+
+    assert results[0]["medicines"][0]["name"] == "Metformin"
+    assert results[1] == SINGLE
+    assert single_calls == ["I have a headache"]
+    assert batcher.stats()["rejected_items"] == 1
+
+
+def test_answers_out_of_order_are_not_routed_to_the_wrong_caller():
+    def swapped(index, text):
+        return answer_from_text(3 - index, text)
+
+    single_calls = []
+    batcher = make_batcher(ScriptedCompletions(swapped), single_calls)
+
+    assert parse_all(batcher, ["I take Metformin 500mg", "I take Warfarin 500mg"]) == [SINGLE, SINGLE]
+    assert sorted(single_calls) == ["I take Metformin 500mg", "I take Warfarin 500mg"]
+
+
+def test_dose_not_in_the_message_is_rejected():
+    def wrong_dose(index, text):
+        answer = answer_from_text(index, text)
+        for med in answer["medicines"]:
+            med["dose_mg"] = "1000"
+        return answer
+
+    single_calls = []
+    batcher = make_batcher(ScriptedCompletions(wrong_dose), single_calls)
+
+    assert parse_all(batcher, ["I take Metformin 500mg", "I have a headache"])[0] == SINGLE
+    assert single_calls == ["I take Metformin 500mg"]
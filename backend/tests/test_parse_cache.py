@@ -0,0 +1,41 @@
+"""
+Tests for the parse result cache (ai/parse_cache.py)
+"""
+import asyncio
+
+from parse_cache import ParseCache
+
+PARSED = {"diseases": ["diabetes"], "medicines": [{"name": "Metformin", "dose_mg": "500", "time": "morning"}],
+          "symptom": "dizziness"}
+
+
+def test_memory_only_by_default():
+    cache = ParseCache()
+    assert cache._db is None
+
+    key = cache.make_key("I take Metformin", "1", "gpt")
+    assert cache.get(key) is None
+    cache.set(key, PARSED)
+    assert cache.get(key) == PARSED
+    assert cache.stats()["hits_memory"] == 1
+
+
+def test_async_access_reads_back_from_sqlite(tmp_path):
+    path = str(tmp_path / "parse_cache.sqlite3")
+    key = ParseCache().make_key("I take Metformin", "1", "gpt")
+
+    async def store_and_load():
+        writer = ParseCache(path=path)
+        await writer.aset(key, PARSED)
+        # Fresh memory tier: the hit has to come from SQLite
+        reader = ParseCache(path=path)
+        return await reader.aget(key), reader.stats()
+
+    parsed, stats = asyncio.run(store_and_load())
+    assert parsed == PARSED
+    assert stats["hits_disk"] == 1
+
+
+def test_normalized_messages_share_a_key():
+    cache = ParseCache()
+    assert cache.make_key("I take  Metformin.", "1", "gpt") == cache.make_key("i take metformin", "1", "gpt")
@@ -0,0 +1,73 @@
+"""
+Tests for hashing backpressure (auth/password_hasher.py, auth/auth_threads.py)
+"""
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio.to_thread
+
+import auth_threads
+from password_hasher import HasherBusyError, PasswordHasher
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_hashes_queued_past_the_limit_are_turned_away():
+    hasher = PasswordHasher(iterations=1000, workers=1, max_pending=2, queue_timeout=0.05)
+    release = threading.Event()
+    pbkdf2 = hasher._pbkdf2
+
+    def slow_pbkdf2(*args):
+        release.wait(5)
+        return pbkdf2(*args)
+
+    hasher._pbkdf2 = slow_pbkdf2
+
+    def attempt():
+        try:
+            return hasher.hash("secret")
+        except HasherBusyError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        futures = [callers.submit(attempt) for _ in range(4)]
+        # The two callers without a slot give up while the two holding one still wait
+        wait_until(lambda: hasher.rejected == 2)
+        assert hasher.completed == 0
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert sum(result is None for result in results) == 2
+    assert hasher.completed == 2
+
+
+def test_auth_calls_do_not_occupy_the_shared_threadpool(monkeypatch):
+    monkeypatch.setattr(auth_threads, "AUTH_MAX_THREADS", 2)
+    release = threading.Event()
+    started = []
+
+    def slow_login():
+        started.append(True)
+        release.wait(5)
+
+    async def scenario():
+        logins = [asyncio.ensure_future(auth_threads.run_auth_call(slow_login)) for _ in range(6)]
+        await asyncio.sleep(0.1)
+        # Session checks still get a thread while every auth thread is busy
+        checked = await asyncio.wait_for(anyio.to_thread.run_sync(lambda: "valid"), timeout=1)
+        in_threads = len(started)
+        release.set()
+        await asyncio.gather(*logins)
+        return checked, in_threads
+
+    checked, in_threads = asyncio.run(scenario())
+    assert checked == "valid"
+    # The other four logins waited on the event loop, not in threads
+    assert in_threads == 2
@@ -0,0 +1,75 @@
+"""
+Tests for the rule-based fast-path parser (ai/rule_parser.py)
+"""
+import pytest
+
+from rule_parser import RuleBasedParser
+
+# Default RULE_PARSER_MIN_CONFIDENCE in ai_layer.py
+THRESHOLD = 0.8
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return RuleBasedParser()
+
+
+def test_common_message_is_parsed_confidently(parser):
+    parsed, confidence = parser.parse(
+        "I have diabetes. I take Metformin 500mg in the morning. After that I feel dizziness."
+    )
+    assert confidence >= THRESHOLD
+    assert parsed == {
+        "diseases": ["diabetes"],
+        "medicines": [{"name": "Metformin", "dose_mg": "500", "time": "morning"}],
+        "symptom": "dizziness"
+    }
+
+
+def test_several_known_drugs_keep_their_own_dose_and_time(parser):
+    parsed, confidence = parser.parse(
+        "I have hypertension. I take Lisinopril 10mg at night and Metformin 500mg in the morning. I feel dizzy."
+    )
+    assert confidence >= THRESHOLD
+    assert parsed["medicines"] == [
+        {"name": "Lisinopril", "dose_mg": "10", "time": "night"},
+        {"name": "Metformin", "dose_mg": "500", "time": "morning"}
+    ]
+
+
+@pytest.mark.parametrize("message", [
+    # Dose belonging to a drug outside the lexicon
+    "I take Metformin 500mg and Januvia 100mg in the morning. I feel dizzy.",
+    "I have diabetes. I take 100mg in the morning.",
+    # Medicine-taking language about an unknown drug
+    "I have diabetes and take Xanax at night and feel dizzy",
+    "I'm on Januvia and I feel dizzy",
+    # Someone else's health
+    "My mother has diabetes",
+    "My husband takes Metformin 500mg in the morning and feels dizzy",
+    "She has hypertension and a headache",
+    # Several time words for one drug
+    "I take Metformin 500mg morning and evening",
+    "I have diabetes. I take Insulin 10mg in the morning and at night.",
+    # Negation
+    "I stopped taking Metformin 500mg in the morning",
+    "I didn't take my Metformin 500mg this morning",
+    "I haven\u2019t taken Metformin 500mg in the morning",
+    "I can't take aspirin 81mg in the morning",
+    "I used to take Warfarin 5mg at night",
+    "I forgot to take Metformin 500mg in the morning",
+    "I take Metformin 500mg in the morning without food",
+    "I'm allergic to Amoxicillin 500mg",
+    "I have no headache",
+    # Questions and advice
+    "Should I take Ibuprofen 400mg at night?",
+    "Can I take Aspirin 81mg in the morning",
+    "I take Metformin 500mg in the morning, is that ok?",
+])
+def test_ambiguous_messages_fall_back_to_the_llm(parser, message):
+    _, confidence = parser.parse(message)
+    assert confidence < THRESHOLD
+
+
+def test_message_without_medical_content_has_zero_confidence(parser):
+    assert parser.parse("hello")[1] == 0.0
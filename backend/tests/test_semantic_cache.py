@@ -0,0 +1,54 @@
+"""
+Tests for the approximate-match explanation cache (ai/semantic_cache.py)
+"""
+import pytest
+
+from semantic_cache import SemanticCache
+
+
+def request(diseases=("type 2 diabetes",), medicines=(("Metformin", "500"),), symptom="feeling dizzy after breakfast"):
+    return {
+        "diseases": list(diseases),
+        "medicines": [{"name": name, "dose_mg": dose, "time": "morning"} for name, dose in medicines],
+        "symptom": symptom
+    }
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache(capacity=16, threshold=0.9)
+    cache.set(request(), "low", "cached explanation")
+    return cache
+
+
+def test_identical_request_hits(cache):
+    assert cache.get(request(), "low") == "cached explanation"
+
+
+def test_symptom_case_and_punctuation_differences_hit(cache):
+    assert cache.get(request(symptom="Feeling dizzy  after breakfast."), "low") == "cached explanation"
+
+
+def test_formatting_differences_hit(cache):
+    reformatted = request(diseases=("Type 2  Diabetes",), medicines=(("metformin", "500 mg"),))
+    assert cache.get(reformatted, "low") == "cached explanation"
+
+
+@pytest.mark.parametrize("different", [
+    request(diseases=("type 1 diabetes",)),
+    request(medicines=(("Metformin", "5000"),)),
+    request(medicines=(("Metformin", "500"), ("Lisinopril", "10"))),
+    request(symptom="severe chest pain"),
+])
+def test_clinically_different_requests_miss(cache, different):
+    assert cache.get(different, "low") is None
+
+
+def test_insulin_dose_change_misses():
+    cache = SemanticCache(capacity=16, threshold=0.9)
+    cache.set(request(diseases=("type 1 diabetes",), medicines=(("Insulin", "10"),)), "low", "10 units")
+    assert cache.get(request(diseases=("type 1 diabetes",), medicines=(("Insulin", "100"),)), "low") is None
+
+
+def test_risk_level_is_part_of_the_key(cache):
+    assert cache.get(request(), "high") is None
@@ -0,0 +1,110 @@
+"""
+Tests for session tracking on the user document (auth/auth_manager.py)
+"""
+import pytest
+
+import auth_manager
+from auth_manager import AuthManager, session_doc_id
+from cosmos_fakes import FakeContainer, FakeDatabase
+from password_hasher import PasswordHasher
+
+EMAIL = "patient@example.com"
+PASSWORD = "secret-1"
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    monkeypatch.setattr(auth_manager, "MAX_SESSIONS_PER_USER", 2)
+    manager = AuthManager(database=FakeDatabase())
+    manager.password_hasher = PasswordHasher(iterations=1000, workers=2)
+    manager.signup(EMAIL, PASSWORD, "Pat")
+    return manager
+
+
+def stored_user(auth):
+    return next(iter(auth.users_container.items.values()))
+
+
+def before_first_user_write(auth, action):
+    """Run action once, just before the next user-document replace reaches the store."""
+    container = auth.users_container
+    replace_item = container.replace_item
+    pending = [action]
+
+    def replace(*args, **kwargs):
+        if pending:
+            pending.pop()()
+        return replace_item(*args, **kwargs)
+
+    container.replace_item = replace
+
+
+def test_oldest_session_is_revoked_beyond_the_cap(auth):
+    tokens = [auth.login(EMAIL, PASSWORD)["session_token"] for _ in range(3)]
+    assert stored_user(auth)["session_ids"] == [session_doc_id(t) for t in tokens[1:]]
+    assert not auth.verify_session(tokens[0])["valid"]
+    assert auth.verify_session(tokens[2])["valid"]
+
+
+def test_overlapping_logins_both_keep_their_sessions(auth):
+    other = []
+    before_first_user_write(auth, lambda: other.append(auth.login(EMAIL, PASSWORD)))
+    login = auth.login(EMAIL, PASSWORD)
+    assert login["success"] and other[0]["success"]
+    assert stored_user(auth)["session_ids"] == [
+        session_doc_id(other[0]["session_token"]), session_doc_id(login["session_token"])
+    ]
+
+
+def test_login_overlapping_deactivation_does_not_reactivate(auth):
+    user_id = stored_user(auth)["id"]
+    before_first_user_write(auth, lambda: auth.deactivate_user(user_id))
+    login = auth.login(EMAIL, PASSWORD)
+    assert not login["success"]
+    user = stored_user(auth)
+    assert user["is_active"] is False
+    assert not user.get("session_ids")
+    assert auth.sessions_container.items == {}
+
+
+def test_deactivation_revokes_a_session_tracked_meanwhile(auth):
+    user_id = stored_user(auth)["id"]
+    logins = []
+    before_first_user_write(auth, lambda: logins.append(auth.login(EMAIL, PASSWORD)))
+    assert auth.deactivate_user(user_id)["success"]
+    assert logins[0]["success"]
+    assert stored_user(auth)["is_active"] is False
+    assert session_doc_id(logins[0]["session_token"]) not in auth.sessions_container.items
+    assert not auth.verify_session(logins[0]["session_token"])["valid"]
+
+
+def test_rehash_does_not_overwrite_a_password_changed_meanwhile(auth):
+    auth.password_hasher = PasswordHasher(iterations=2000, workers=2)
+    changed = "pbkdf2_sha256$2000$salt$changed"
+
+    def change_password():
+        user = stored_user(auth)
+        user["password_hash"] = changed
+        auth.users_container.replace_item(user["id"], user)
+
+    before_first_user_write(auth, change_password)
+    assert auth.login(EMAIL, PASSWORD)["success"]
+    assert stored_user(auth)["password_hash"] == changed
+
+
+@pytest.mark.parametrize("name", [auth_manager.SESSIONS_CONTAINER_NAME, auth_manager.EMAIL_INDEX_CONTAINER_NAME])
+def test_existing_container_on_another_partition_key_is_refused(name):
+    database = FakeDatabase()
+    database.containers[name] = FakeContainer(name, "/userId")
+    with pytest.raises(RuntimeError, match="partition key /id"):
+        AuthManager(database=database)
+
+
+def test_verified_session_is_answered_from_the_cache(auth):
+    token = auth.login(EMAIL, PASSWORD)["session_token"]
+    assert auth.cached_session(token) is None
+    assert auth.verify_session(token, check_cache=False)["valid"]
+    assert auth.session_cache.stats()["misses"] == 1
+
+    auth.sessions_container.items.clear()
+    assert auth.cached_session(token)["valid"]
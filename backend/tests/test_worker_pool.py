@@ -0,0 +1,135 @@
+"""
+Tests for the warm quantum worker pool (quantum/worker_pool.py)
+"""
+import sys
+import textwrap
+import time
+
+import pytest
+
+from quantum.worker_pool import QuantumWorkerPool
+
+# Speaks the quantum_worker.py protocol without the solver stack
+FAKE_WORKER = textwrap.dedent('''
+    import json
+    import sys
+
+    print(json.dumps({"id": None, "ok": True, "ready": True}), flush=True)
+    for line in sys.stdin:
+        job = json.loads(line)
+        drugs = job["input"]["drugs"]
+        result = {"v": 1, "x": [1] * len(drugs), "e": -2.5, "s": "SUCCESS", "t": {"solve_ms": 1.0}}
+        print(json.dumps({"id": job["id"], "ok": True, "result": result}), flush=True)
+''')
+
+PROBLEM = {
+    "drugs": ["Metformin", "Lisinopril"],
+    "dosage": {"Metformin": 0.5, "Lisinopril": 0.01},
+    "timing": {"Metformin": 0.2, "Lisinopril": 0.2},
+    "interactions": {("Metformin", "Lisinopril"): 0.3},
+    "patient_modifier": 1.0
+}
+
+
+@pytest.fixture
+def worker_script(tmp_path):
+    path = tmp_path / "fake_worker.py"
+    path.write_text(FAKE_WORKER)
+    return path
+
+
+def make_pool(python_bin, worker_script, **kwargs):
+    kwargs.setdefault("size", 1)
+    kwargs.setdefault("job_timeout", 10.0)
+    kwargs.setdefault("startup_timeout", 10.0)
+    return QuantumWorkerPool(python_bin, str(worker_script), **kwargs)
+
+
+def test_solve_returns_decoded_result(worker_script):
+    pool = make_pool(sys.executable, worker_script)
+    try:
+        result = pool.solve(PROBLEM)
+        assert result.status == "SUCCESS"
+        assert result.energy == -2.5
+        assert result.solution_dict(PROBLEM["drugs"]) == {"Metformin": 1, "Lisinopril": 1}
+    finally:
+        pool.shutdown()
+
+
+def test_pool_starts_on_first_use_not_construction(worker_script):
+    pool = make_pool(sys.executable, worker_script)
+    try:
+        assert pool._live == 0 and pool._starting == 0
+        pool.solve(PROBLEM)
+        assert pool._live == 1
+    finally:
+        pool.shutdown()
+
+
+def test_start_is_idempotent(worker_script):
+    pool = make_pool(sys.executable, worker_script, size=2)
+    try:
+        pool.start()
+        pool.start()
+        pool.solve(PROBLEM)
+        deadline = time.monotonic() + 10
+        while pool._starting and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool._live == 2
+    finally:
+        pool.shutdown()
+
+
+def test_fails_fast_without_live_workers(tmp_path, worker_script):
+    pool = make_pool(str(tmp_path / "missing-python"), worker_script,
+                     job_timeout=30.0, spawn_backoff=5.0)
+    try:
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="No quantum workers running"):
+            pool.solve(PROBLEM)
+        assert time.monotonic() - started < 5.0
+    finally:
+        pool.shutdown()
+
+
+def test_failed_spawn_is_retried(tmp_path):
+    # The worker script only appears after the first attempt has failed
+    script = tmp_path / "late_worker.py"
+    pool = make_pool(sys.executable, script, spawn_backoff=0.2)
+    try:
+        pool.start()
+        deadline = time.monotonic() + 5
+        while pool._starting and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert pool._live == 0
+
+        script.write_text(FAKE_WORKER)
+        deadline = time.monotonic() + 10
+        while pool._live == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.solve(PROBLEM).status == "SUCCESS"
+    finally:
+        pool.shutdown()
+
+
+def test_dead_worker_is_replaced(worker_script):
+    pool = make_pool(sys.executable, worker_script)
+    try:
+        pool.solve(PROBLEM)
+        worker = pool._idle.get_nowait()
+        worker.proc.kill()
+        worker.proc.wait()
+        pool._idle.put(worker)
+
+        with pytest.raises(RuntimeError):
+            pool.solve(PROBLEM)
+        assert pool.solve(PROBLEM).status == "SUCCESS"
+    finally:
+        pool.shutdown()
+
+
+def test_solve_after_shutdown_raises(worker_script):
+    pool = make_pool(sys.executable, worker_script)
+    pool.shutdown()
+    with pytest.raises(RuntimeError, match="shut down"):
+        pool.solve(PROBLEM)
@@ -0,0 +1,97 @@
+"""
+Tests for batch failure handling in the write-behind queue (write_behind.py)
+"""
+import asyncio
+
+from write_behind import WriteBehindQueue
+
+
+class WriteError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def is_retryable(error):
+    return error.status_code in (429, 503)
+
+
+class FakeStore:
+    """Batch and single writers that fail for documents marked with a status code."""
+
+    def __init__(self, batch_failures=()):
+        self.batch_failures = list(batch_failures)
+        self.batches = []
+        self.singles = []
+
+    async def write_batch(self, container, partition_key, documents):
+        self.batches.append((container, partition_key, [d["id"] for d in documents]))
+        if self.batch_failures:
+            raise WriteError(self.batch_failures.pop(0))
+        for document in documents:
+            if "fail" in document:
+                raise WriteError(document["fail"])
+
+    async def write_one(self, container, document):
+        self.singles.append(document["id"])
+        if "fail" in document:
+            raise WriteError(document["fail"])
+
+
+def make_queue(store):
+    return WriteBehindQueue(store.write_batch, store.write_one, is_retryable=is_retryable,
+                            batch_size=10, max_retries=2)
+
+
+def test_non_retryable_batch_failure_isolates_the_bad_document():
+    store = FakeStore()
+    queue = make_queue(store)
+    dropped = []
+
+    async def scenario():
+        queue.enqueue("chat", {"id": "a", "userId": "u1"}, on_drop=lambda: dropped.append("a"))
+        queue.enqueue("chat", {"id": "b", "userId": "u1", "fail": 413}, on_drop=lambda: dropped.append("b"))
+        queue.enqueue("chat", {"id": "c", "userId": "u1"}, on_drop=lambda: dropped.append("c"))
+        await queue.drain()
+
+    asyncio.run(scenario())
+    # One batch attempt, then each document once; the rejected one is not retried
+    assert len(store.batches) == 1
+    assert sorted(store.singles) == ["a", "b", "c"]
+    assert dropped == ["b"]
+    stats = queue.stats()
+    assert stats["written"] == 2
+    assert stats["rejected"] == 1
+    assert stats["retries"] == 0
+
+
+def test_retryable_batch_failure_retries_the_batch():
+    store = FakeStore(batch_failures=[429])
+    queue = make_queue(store)
+
+    async def scenario():
+        queue.enqueue("chat", {"id": "a", "userId": "u1"})
+        queue.enqueue("chat", {"id": "b", "userId": "u1"})
+        await queue.drain()
+
+    asyncio.run(scenario())
+    assert [ids for _, _, ids in store.batches] == [["a", "b"], ["a", "b"]]
+    assert store.singles == []
+    assert queue.stats()["written"] == 2
+
+
+def test_batches_follow_the_configured_partition_key():
+    store = FakeStore()
+    queue = make_queue(store)
+    queue.set_partition_key("risk", "tenant")
+    queue.set_partition_key("chat", None)
+
+    async def scenario():
+        for i in range(2):
+            queue.enqueue("risk", {"id": f"r{i}", "userId": f"u{i}", "tenant": "t"})
+            queue.enqueue("chat", {"id": f"c{i}", "userId": "u1"})
+        await queue.drain()
+
+    asyncio.run(scenario())
+    assert store.batches == [("risk", "t", ["r0", "r1"])]
+    assert sorted(store.singles) == ["c0", "c1"]
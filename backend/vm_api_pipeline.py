@@ -6,21 +6,37 @@ Upload this file to your VM backend folder
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import subprocess
 import json
 import sys
 import os
+import atexit
 from datetime import datetime
 
 # Add paths for imports (correct VM paths)
 sys.path.append('/home/phanijadav/project/QureAi/backend/ai')
-sys.path.append('/home/phanijadav/project/QureAi/backend/quantum')
+sys.path.append('/home/phanijadav/project/QureAi/backend')
 
-from ai_layer import parse_user_message, explain_symptom
+from ai_layer import parse_user_message, explain_symptom, prewarm as prewarm_ai
+from interaction_engine import InteractionEngine
+from quantum.worker_pool import QuantumWorkerPool
+from quantum.analytic_solver import solve_trivial
+from quantum.result_protocol import QuantumResult
 
 app = Flask(__name__)
 CORS(app)
 
+# Warm quantum workers (qenv interpreter) shared by all requests
+quantum_pool = QuantumWorkerPool(
+    python_bin=os.getenv("QUANTUM_PYTHON_BIN", "/home/phanijadav/project/QureAi/backend/quantum/qenv/bin/python"),
+    worker_script="/home/phanijadav/project/QureAi/backend/quantum/quantum_worker.py",
+    size=int(os.getenv("QUANTUM_WORKERS", "2")),
+    job_timeout=float(os.getenv("QUANTUM_JOB_TIMEOUT", "30"))
+)
+# Workers are spawned on first use (or prewarmed below), never at import time
+atexit.register(quantum_pool.shutdown)
+
+interaction_engine = InteractionEngine()
+
 def calculate_safety_score(fval):
     """Convert quantum fval to safety score (0-100) and risk level"""
     if fval <= -5.0:
@@ -67,42 +83,32 @@ def analyze_health():
         print(f"Parsed Medical Data: {json.dumps(parsed, indent=2)}")
 
         # ----------------------------
-        # STEP 2: SEND TO QUANTUM (correct VM paths)
+        # STEP 2: SEND TO QUANTUM (warm worker pool)
         # ----------------------------
-        quantum_script = "/home/phanijadav/project/QureAi/backend/quantum/json_to_quantum_test.py"
-        python_bin = "/home/phanijadav/project/QureAi/backend/quantum/qenv/bin/python"
-
-        result = subprocess.run(
-            [python_bin, quantum_script],
-            capture_output=True,
-            text=True
-        )
-
-        print(f"Quantum Raw Output: {result.stdout}")
+        quantum_input = interaction_engine.build_quantum_input(parsed)
+        fval = -1.0
+        quantum_status = "FAILED"
+        quantum_output = None
+
+        try:
+            trivial = solve_trivial(quantum_input)
+            if trivial is not None:
+                # 0-1 drugs: closed-form answer, no solver needed
+                quantum_output = QuantumResult.from_engine(trivial, quantum_input["drugs"])
+            else:
+                quantum_output = quantum_pool.solve(quantum_input)
+            fval = quantum_output.energy
+            quantum_status = quantum_output.status
+        except Exception as e:
+            print(f"Quantum worker error: {e}")
+
+        print(f"Quantum Result: {quantum_output}")
 
         # ----------------------------
         # STEP 3: INTERPRET QUANTUM RESULT (same as pipeline_test.py)
         # ----------------------------
-        fval = -1.0
-        quantum_status = "FAILED"
-        
-        if result.returncode == 0 and result.stdout:
-            # Parse quantum output to extract fval
-            lines = result.stdout.strip().split('\n')
-            for line in lines:
-                if 'fval=' in line:
-                    try:
-                        # Extract fval from output like "fval=-2.345"
-                        fval_str = line.split('fval=')[1].split(',')[0].split()[0]
-                        fval = float(fval_str)
-                        quantum_status = "SUCCESS"
-                        break
-                    except Exception as e:
-                        print(f"Error parsing fval: {e}")
-                        pass
-                        
         # Simple risk logic (same as pipeline_test.py)
-        if "status=SUCCESS" in result.stdout or quantum_status == "SUCCESS":
+        if quantum_status == "SUCCESS":
             quantum_risk = "low"
         else:
             quantum_risk = "medium"
@@ -127,7 +133,8 @@ def analyze_health():
             'quantum_result': {
                 'fval': fval,
                 'status': quantum_status,
-                'raw_output': result.stdout
+                'solution': quantum_output.solution_dict(quantum_input["drugs"]) if quantum_output else {},
+                'timings': quantum_output.timings if quantum_output else {}
             },
             'safety_score': safety_data['score'],
             'risk_level': safety_data['risk_level'],
@@ -178,5 +185,14 @@ if __name__ == '__main__':
     print("Frontend should connect to: http://YOUR_VM_IP:5000")
     print("=" * 50)
     
+    # Build LLM clients and open their connection pool before the first request
+    prewarm_ai()
+    
+    debug = True
+    # The debug reloader runs this block in a watcher process as well; only
+    # the process that serves requests (WERKZEUG_RUN_MAIN) warms quantum workers
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        quantum_pool.start()
+    
     # Run on all interfaces so frontend can connect
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=debug)
@@ -0,0 +1,229 @@
+"""
+Write-Behind Queue for QuraAI
+Buffers fire-and-forget documents (chat turns, risk assessments) in memory
+and persists them in per-container, per-partition batches off the request
+path, flushing on batch size or time and retrying with backoff. A batch that
+fails for a reason retrying cannot fix is split into single writes, so one
+bad document does not take the rest of its batch down with it; documents
+rejected on their own are logged and dropped, never requeued.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """In-process batched writer with bounded memory and drop accounting."""
+
+    def __init__(self, write_batch, write_one, is_retryable=lambda error: True, max_queue=10000,
+                 batch_size=50, flush_interval=0.5, max_retries=5, partition_key_field="userId"):
+        """
+        Initialize queue (the flush loop starts on first use or start()).
+
+        Args:
+            write_batch: Coroutine function (container, partition_key, documents) persisting one batch atomically
+            write_one: Coroutine function (container, document) persisting a single document
+            is_retryable: Predicate telling transient write errors (throttling, timeouts) from permanent ones
+            max_queue: Documents buffered or in flight across all containers before new ones are dropped
+            batch_size: Flush a container as soon as this many documents wait (Cosmos batches allow 100)
+            flush_interval: Seconds between time-based flushes
+            max_retries: Retries per batch or document before it is dropped
+            partition_key_field: Document field holding the partition key (see set_partition_key)
+        """
+        self.write_batch = write_batch
+        self.write_one = write_one
+        self.is_retryable = is_retryable
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.partition_key_field = partition_key_field
+        self._partition_key_fields = {}
+
+        self._queues = defaultdict(deque)
+        self._depth = 0
+        self._in_flight = 0
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped_full = 0
+        self.dropped_failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the background flush loop on the running event loop."""
+        if self._task is None:
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    def set_partition_key(self, container, field):
+        """
+        Set the document field a container is partitioned on.
+
+        Args:
+            container: Container name
+            field: Top-level document field, or None to write the container's documents one at a time
+        """
+        self._partition_key_fields[container] = field
+
+    def enqueue(self, container, document, on_drop=None) -> bool:
+        """
+        Queue a document for writing; never blocks.
+
+        Args:
+            container: Container name
+            document: Document to upsert
+            on_drop: Optional callable run if the document is finally dropped
+
+        Returns:
+            False if the queue is full (or shutting down) and the document was dropped
+        """
+        if self._closing or self._depth + self._in_flight >= self.max_queue:
+            self.dropped_full += 1
+            if on_drop is not None:
+                on_drop()
+            return False
+
+        self.start()
+        queue = self._queues[container]
+        queue.append((document, on_drop, time.monotonic()))
+        self._depth += 1
+        self.enqueued += 1
+        if len(queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything currently queued."""
+        pending = []
+        for container, queue in self._queues.items():
+            field = self._partition_key_fields.get(container, self.partition_key_field)
+            groups = defaultdict(list)
+            while queue:
+                document, on_drop, _ = queue.popleft()
+                self._depth -= 1
+                if field is None:
+                    pending.append(self._write(container, None, [(document, on_drop)]))
+                else:
+                    groups[document.get(field)].append((document, on_drop))
+            for partition_key, items in groups.items():
+                for i in range(0, len(items), self.batch_size):
+                    pending.append(self._write(container, partition_key, items[i:i + self.batch_size]))
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def _write(self, container, partition_key, items):
+        self._in_flight += len(items)
+        try:
+            await self._write_with_retries(container, partition_key, items)
+        finally:
+            self._in_flight -= len(items)
+
+    async def _write_with_retries(self, container, partition_key, items):
+        if len(items) == 1:
+            await self._write_single(container, *items[0])
+            return
+
+        documents = [document for document, _ in items]
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.write_batch(container, partition_key, documents)
+                self.batches += 1
+                self.written += len(documents)
+                return
+            except Exception as e:
+                if not self.is_retryable(e):
+                    # Batches are all-or-nothing: find out which documents are at fault
+                    await asyncio.gather(*(self._write_single(container, document, on_drop)
+                                           for document, on_drop in items))
+                    return
+                if attempt == self.max_retries:
+                    logger.warning("Write-behind batch to %s dropped after %d attempts: %s", container, attempt + 1, e)
+                    break
+                self.retries += 1
+                await self._backoff(attempt)
+
+        self._dropped(items)
+
+    async def _write_single(self, container, document, on_drop):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.write_one(container, document)
+                self.written += 1
+                return
+            except Exception as e:
+                if not self.is_retryable(e):
+                    self.rejected += 1
+                    logger.error("Write-behind rejected document %s in %s: %s", document.get("id"), container, e)
+                    break
+                if attempt == self.max_retries:
+                    logger.warning("Write-behind document %s in %s dropped after %d attempts: %s",
+                                   document.get("id"), container, attempt + 1, e)
+                    self.dropped_failed += 1
+                    break
+                self.retries += 1
+                await self._backoff(attempt)
+
+        if on_drop is not None:
+            on_drop()
+
+    @staticmethod
+    async def _backoff(attempt):
+        # Full jitter backoff, capped so a drain still finishes promptly
+        await asyncio.sleep(random.uniform(0, min(5.0, 0.1 * (2 ** attempt))))
+
+    def _dropped(self, items):
+        self.dropped_failed += len(items)
+        for _, on_drop in items:
+            if on_drop is not None:
+                on_drop()
+
+    async def drain(self, timeout=10.0):
+        """Stop accepting documents and flush what is queued (call at shutdown)."""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+        # Anything enqueued after the loop's last pass
+        await asyncio.wait_for(self.flush(), timeout=timeout)
+
+    def stats(self) -> dict:
+        """Queue depth, throughput and drop counters."""
+        now = time.monotonic()
+        oldest = min((queue[0][2] for queue in self._queues.values() if queue), default=None)
+        return {
+            "queue_depth": self._depth,
+            "queue_depth_by_container": {name: len(queue) for name, queue in self._queues.items()},
+            "in_flight": self._in_flight,
+            "oldest_pending_seconds": now - oldest if oldest is not None else 0.0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped_queue_full": self.dropped_full,
+            "dropped_write_failed": self.dropped_failed,
+            "rejected": self.rejected
+        }